@@ -0,0 +1,113 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from events.models import Event
+from events.serializers import CustomEventSerializerV1, serialize_event_rows
+from events.utils import get_event_rows, optimize_event_queryset
+from rest_framework.renderers import JSONRenderer
+from user.models import EndUser, Organization, User
+
+import random
+import time
+
+
+def serialize_with_fields(queryset):
+    return CustomEventSerializerV1(optimize_event_queryset(queryset), many=True).data
+
+
+def serialize_with_rows(queryset):
+    return serialize_event_rows(get_event_rows(queryset))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark of the event feed serialization, in rows per second, "
+        "against events seeded in a transaction rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=2000)
+        parser.add_argument("--endusers", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            organization = self.seed(options)
+            queryset = Event.objects.filter(organization=organization).order_by(
+                "-timestamp", "-id"
+            )
+
+            # Both paths have to render the same response
+            renderer = JSONRenderer()
+            if renderer.render(serialize_with_fields(queryset)) != renderer.render(
+                serialize_with_rows(queryset)
+            ):
+                raise CommandError("The row serializer output differs")
+
+            self.stdout.write(
+                f"{options['events']} events, {options['endusers']} end users, "
+                f"best of {options['repeat']}"
+            )
+            before = self.measure(serialize_with_fields, queryset, options)
+            after = self.measure(serialize_with_rows, queryset, options)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(f"SerializerMethodField: {before:>12,.0f} rows/s")
+        self.stdout.write(f"values() projection:   {after:>12,.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {after / before:.1f}x"))
+
+    def measure(self, serialize, queryset, options):
+        best = None
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            rows = len(serialize(queryset.all()))
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return rows / best
+
+    def seed(self, options):
+        organization = Organization.objects.create(name="Serializer benchmark")
+        agent = User.objects.create(first_name="Agent", email="agent@example.com")
+
+        # User inherits from another model and cannot be bulk created
+        users = [
+            User.objects.create(
+                first_name=f"First {index}",
+                last_name=f"Last {index}",
+                email=f"enduser{index}@example.com",
+                phone=f"+1555{index:07d}",
+            )
+            for index in range(options["endusers"])
+        ]
+        EndUser.objects.bulk_create(
+            EndUser(
+                user=user,
+                organization=organization,
+                role="Engineer",
+                company="Example",
+                total_sessions=3,
+            )
+            for user in users
+        )
+
+        event_types = [event_type for event_type, _ in Event.event_types]
+        events = []
+        for _ in range(options["events"]):
+            enduser = random.choice(users)
+            is_parent = random.random() < 0.5
+            events.append(
+                Event(
+                    event_type=random.choice(event_types),
+                    source_user_id=agent.id if is_parent else enduser.id,
+                    destination_user_id=enduser.id if is_parent else agent.id,
+                    src_user=agent if is_parent else enduser,
+                    dest_user=enduser if is_parent else agent,
+                    is_parent=is_parent,
+                    status=Event.COMPLETED,
+                    frontend_screen="NA",
+                    agent_name="Agent",
+                    organization=organization,
+                )
+            )
+        Event.objects.bulk_create(events)
+        return organization
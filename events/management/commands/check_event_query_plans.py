@@ -0,0 +1,163 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from events.models import Event
+from events.utils import get_enduser_events
+from user.models import Organization
+
+import random
+import time
+
+
+# What the query plan of a full scan of the events table looks like
+FULL_SCAN_MARKERS = {
+    "postgresql": "Seq Scan on events_event",
+    "mysql": "Table scan on events_event",
+    "sqlite": "SCAN events_event",
+}
+
+# Event types of the unseen events of an end user, see EventPublicAPIView
+UNSEEN_EVENT_TYPES = [
+    "CALLED_US",
+    "ANSWERED_OUR_CALL",
+    "MISSED_OUR_CALL",
+    "WE_SENT_AUDIO_NOTE",
+]
+
+
+def get_hot_queries(organization_id, end_user_id):
+    """
+    The event reads of the API, with the filters the views use.
+    """
+    return {
+        "organization timeline": Event.objects.filter(
+            organization_id=organization_id
+        ).order_by("-timestamp")[:50],
+        "end user events": get_enduser_events(end_user_id),
+        "unread events count": Event.objects.filter(
+            organization_id=organization_id,
+            source_user_id=end_user_id,
+            is_unread=True,
+        ).values("pk"),
+        "unseen events": Event.objects.filter(
+            destination_user_id=end_user_id,
+            is_seen_enduser=False,
+            event_type__in=UNSEEN_EVENT_TYPES,
+        ),
+        "last event of an end user": Event.objects.filter(
+            destination_user_id=end_user_id,
+            event_type__in=["MISSED_OUR_CALL", "WE_SENT_AUDIO_NOTE"],
+        ).order_by("-timestamp")[:1],
+        "event of an interaction": Event.objects.filter(
+            interaction_id=str(end_user_id)
+        )[:1],
+    }
+
+
+def explain(queryset):
+    if connection.vendor == "mysql":
+        return queryset.explain(format="TREE")
+    return queryset.explain()
+
+
+def analyze_events_table():
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("ANALYZE events_event")
+        elif connection.vendor == "mysql":
+            cursor.execute("ANALYZE TABLE events_event")
+        else:
+            cursor.execute("ANALYZE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Fails when one of the hot event reads plans a full scan of the events "
+        "table, optionally against a seeded table rolled back afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Events to insert before explaining, e.g. 1000000",
+        )
+        parser.add_argument("--organizations", type=int, default=100)
+        parser.add_argument("--endusers", type=int, default=20000)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--verbose-plans", action="store_true")
+
+    def handle(self, *args, **options):
+        marker = FULL_SCAN_MARKERS.get(connection.vendor)
+        if marker is None:
+            raise CommandError(f"Unsupported database {connection.vendor}")
+
+        with transaction.atomic():
+            if options["seed"]:
+                organization_id, end_user_id = self.seed(options)
+            else:
+                event = Event.objects.exclude(organization=None).last()
+                if event is None:
+                    raise CommandError("No events, run with --seed")
+                organization_id = event.organization_id
+                end_user_id = event.source_user_id or event.destination_user_id
+
+            full_scans = []
+            for name, queryset in get_hot_queries(organization_id, end_user_id).items():
+                plan = explain(queryset)
+                if options["verbose_plans"]:
+                    self.stdout.write(plan)
+                if self.is_full_scan(plan, marker):
+                    full_scans.append(name)
+                    self.stdout.write(self.style.ERROR(f"full scan   {name}"))
+                else:
+                    self.stdout.write(f"index scan  {name}")
+
+            # Nothing that was seeded is kept
+            transaction.set_rollback(True)
+
+        if full_scans:
+            raise CommandError(f"Full scans of the events table: {full_scans}")
+        self.stdout.write(self.style.SUCCESS("Every query uses an index"))
+
+    def is_full_scan(self, plan, marker):
+        for line in plan.splitlines():
+            # SQLite reports index only scans as SCAN ... USING COVERING INDEX
+            if marker in line and "USING" not in line:
+                return True
+        return False
+
+    def seed(self, options):
+        started = time.perf_counter()
+        organizations = Organization.objects.bulk_create(
+            Organization(name=f"Query plan {index}")
+            for index in range(options["organizations"])
+        )
+        organization_ids = [organization.id for organization in organizations]
+        event_types = [event_type for event_type, _ in Event.event_types]
+
+        remaining = options["seed"]
+        while remaining > 0:
+            batch = []
+            for _ in range(min(options["batch_size"], remaining)):
+                batch.append(
+                    Event(
+                        event_type=random.choice(event_types),
+                        source_user_id=random.randint(1, options["endusers"]),
+                        destination_user_id=random.randint(1, options["endusers"]),
+                        status=Event.COMPLETED,
+                        frontend_screen="NA",
+                        interaction_id=str(random.randint(1, 10 * options["seed"])),
+                        is_seen_enduser=random.random() < 0.95,
+                        is_unread=random.random() < 0.1,
+                        organization_id=random.choice(organization_ids),
+                    )
+                )
+            Event.objects.bulk_create(batch)
+            remaining -= len(batch)
+
+        analyze_events_table()
+        self.stdout.write(
+            f"Seeded {options['seed']:,} events in {time.perf_counter() - started:.0f}s"
+        )
+        return organization_ids[0], random.randint(1, options["endusers"])
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("events", "0014_event_sub_event_type"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["organization", "-timestamp", "-id"], name="event_org_feed_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["organization", "source_user_id", "is_unread"],
+                name="event_org_source_unread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["source_user_id", "-timestamp"], name="event_source_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["destination_user_id", "event_type", "-timestamp"],
+                name="event_destination_type_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["destination_user_id", "is_seen_enduser", "event_type"],
+                name="event_unseen_enduser_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["interaction_id"], name="event_interaction_idx"),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.10 on 2026-10-18 07:03
+
+from django.db import migrations, models
+
+
+# Rows updated at once by the backfill, one UPDATE of the whole table would
+# lock it for as long as it runs
+BATCH_SIZE = 10000
+
+
+def forwards_func(apps, schema_editor):
+    Event = apps.get_model("events", "Event")
+    db_alias = schema_editor.connection.alias
+    events = Event.objects.using(db_alias)
+    last_id = events.aggregate(last_id=models.Max("id"))["last_id"] or 0
+    # Existing events were last changed when they were created as far as we know
+    for start in range(0, last_id, BATCH_SIZE):
+        events.filter(id__gt=start, id__lte=start + BATCH_SIZE).update(
+            modified_at=models.F("timestamp")
+        )
+
+
+class Migration(migrations.Migration):
+    # Each batch of the backfill is committed on its own
+    atomic = False
+
+    dependencies = [
+        ("events", "0015_event_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="modified_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="event",
+            name="modified_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["organization", "modified_at", "id"],
+                name="event_org_modified_idx",
+            ),
+        ),
+    ]
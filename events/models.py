@@ -12,8 +12,6 @@ from user.constants import (
 
 class Event(models.Model):
 
-    # TODO should create appropirate indexes for the fields
-
     CALL_SCHEDULED = "CALL_SCHEDULED"
     SCHEDULED_CALL_HELD = "SCHEDULED_CALL_HELD"
     CALLED_US = "CALLED_US"
@@ -75,6 +73,9 @@ class Event(models.Model):
 
     event_type = models.CharField(max_length=255, choices=event_types)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Bumped by every change, the watermark of EventSyncAPIView. Querysets
+    # .update() bypasses auto_now, set it there explicitly
+    modified_at = models.DateTimeField(auto_now=True)
     source_user_id = models.IntegerField(blank=True, null=True)
     destination_user_id = models.IntegerField(blank=True, null=True)
     status = models.CharField(max_length=255, choices=status_choices)
@@ -140,6 +141,40 @@ class Event(models.Model):
 
     sub_event_type = models.CharField(max_length=255, blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # Organization timelines, in the order of EventCursorPagination
+            models.Index(
+                fields=["organization", "-timestamp", "-id"],
+                name="event_org_feed_idx",
+            ),
+            # Unread counts and mark as read of an end user
+            models.Index(
+                fields=["organization", "source_user_id", "is_unread"],
+                name="event_org_source_unread_idx",
+            ),
+            # Both halves of the events of an end user, see get_enduser_events
+            models.Index(
+                fields=["source_user_id", "-timestamp"], name="event_source_idx"
+            ),
+            models.Index(
+                fields=["destination_user_id", "event_type", "-timestamp"],
+                name="event_destination_type_idx",
+            ),
+            # Events the end user has not seen yet. Not a partial index,
+            # MySQL ignores their condition
+            models.Index(
+                fields=["destination_user_id", "is_seen_enduser", "event_type"],
+                name="event_unseen_enduser_idx",
+            ),
+            models.Index(fields=["interaction_id"], name="event_interaction_idx"),
+            # Changes of an organization, see EventSyncPagination
+            models.Index(
+                fields=["organization", "modified_at", "id"],
+                name="event_org_modified_idx",
+            ),
+        ]
+
     # create a string representation for the event model
     def __str__(self):
         return self.event_type
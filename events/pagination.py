@@ -0,0 +1,146 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+import base64
+import binascii
+import json
+
+
+def encode_position(moment, id):
+    position = [moment.isoformat(), id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def get_position(event, field):
+    # Pages hold either events or their rows from get_event_rows
+    if isinstance(event, dict):
+        return event[field], event["id"]
+    return getattr(event, field), event.id
+
+
+def encode_cursor(event, field="timestamp"):
+    return encode_position(*get_position(event, field))
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(timestamp), int(id)
+    except (binascii.Error, ValueError, TypeError):
+        raise NotFound("Invalid cursor")
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset pagination of events, newest first, on (timestamp, id).
+
+    A page starts from the position of an event rather than an offset, so it
+    costs one index range scan however old the account is, and events
+    created meanwhile do not shift the pages. `before` pages to older events,
+    `after` to newer ones, both take a cursor of a previous response.
+    """
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params["page_size"])
+        except (KeyError, ValueError):
+            return settings.EVENT_PAGE_SIZE
+        return min(max(page_size, 1), settings.EVENT_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        before = request.query_params.get("before")
+        after = request.query_params.get("after")
+
+        if after:
+            timestamp, id = decode_cursor(after)
+            # The events right after the cursor, newest first like other pages
+            queryset = queryset.filter(timestamp__gte=timestamp).exclude(
+                timestamp=timestamp, id__lte=id
+            )
+            page = list(queryset.order_by("timestamp", "id")[:page_size])
+            page.reverse()
+            # The event of the cursor at least is older than the page
+            self.before = encode_cursor(page[-1]) if page else after
+            self.after = encode_cursor(page[0]) if page else after
+            return page
+
+        if before:
+            timestamp, id = decode_cursor(before)
+            queryset = queryset.filter(timestamp__lte=timestamp).exclude(
+                timestamp=timestamp, id__gte=id
+            )
+
+        page = list(queryset.order_by("-timestamp", "-id")[: page_size + 1])
+        has_older = len(page) > page_size
+        page = page[:page_size]
+
+        self.before = encode_cursor(page[-1]) if has_older else None
+        self.after = encode_cursor(page[0]) if page else before
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "before": self.before,
+                "after": self.after,
+            }
+        )
+
+
+class EventSyncPagination(EventCursorPagination):
+    """
+    Pages through the events created or changed after a watermark, oldest
+    change first on (modified_at, id).
+
+    modified_at is taken before the change commits, so a slow transaction
+    can commit a change older than one already handed out. The watermark
+    given back with the last page never goes past EVENT_SYNC_SETTLE seconds
+    ago, and the changes since then are sent again on the next poll. Clients
+    apply the events by id, which makes a repeated one harmless.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        since = request.query_params.get("since")
+
+        position = None
+        if since:
+            position = decode_cursor(since)
+            queryset = queryset.filter(modified_at__gte=position[0]).exclude(
+                modified_at=position[0], id__lte=position[1]
+            )
+
+        page = list(queryset.order_by("modified_at", "id")[: page_size + 1])
+        self.has_more = len(page) > page_size
+        page = page[:page_size]
+
+        if page:
+            last = get_position(page[-1], "modified_at")
+        else:
+            last = position
+
+        if self.has_more:
+            # Catching up, the next page is asked for right away
+            watermark = last
+        else:
+            settled = timezone.now() - timedelta(seconds=settings.EVENT_SYNC_SETTLE)
+            watermark = min(last, (settled, 0)) if last else (settled, 0)
+            if position:
+                watermark = max(watermark, position)
+        self.since = encode_position(*watermark)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "since": self.since,
+                "has_more": self.has_more,
+            }
+        )
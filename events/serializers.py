@@ -1,3 +1,4 @@
+from django.db import models
 from rest_framework import serializers
 from .models import Event
 from user.models import User
@@ -196,6 +197,7 @@ class CustomEventSerializerV1(serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = [
+            "id",
             "event_type",
             "source_user_id",
             "destination_user_id",
@@ -233,9 +235,108 @@ class CustomEventSerializerV1(serializers.ModelSerializer):
             "name",
             "sub_event_type",
             "enduser_phone",
+            "modified_at",
         ]
 
 
+# Formats modified_at like the ModelSerializer field of CustomEventSerializerV1
+modified_at_field = serializers.DateTimeField()
+
+
+def serialize_event_rows(rows):
+    """
+    Builds the output of CustomEventSerializerV1 from the dicts of
+    get_event_rows, without a serializer field per column.
+
+    Events without an end user get None for the end user columns, where
+    CustomEventSerializerV1 fails on a user without an end user row. is_new
+    and check_in_status are False for them in both.
+    """
+    data = []
+    for row in rows:
+        user = "dest_user" if row["is_parent"] else "src_user"
+        # check_in_status is not nullable, None means no end user row
+        has_end_user = row[f"{user}__end_user__check_in_status"] is not None
+        data.append(
+            {
+                "id": row["id"],
+                "event_type": row["event_type"],
+                "source_user_id": row["source_user_id"],
+                "destination_user_id": row["destination_user_id"],
+                "status": row["status"],
+                "duration": row["duration"],
+                "frontend_screen": row["frontend_screen"],
+                "request_meta": row["request_meta"],
+                "error_stack_trace": row["error_stack_trace"],
+                "agent_name": row["agent_name"],
+                "initiated_by": row["initiated_by"],
+                "interaction_type": row["interaction_type"],
+                "interaction_id": row["interaction_id"],
+                "is_parent": row["is_parent"],
+                "source_username": row["src_user__first_name"],
+                "destination_username": row["dest_user__first_name"],
+                "timestamp": row["timestamp"],
+                "enduser_id": row[f"{user}__id"],
+                "enduser_first_name": row[f"{user}__first_name"],
+                "enduser_last_name": row[f"{user}__last_name"],
+                "enduser_is_online": row[f"{user}__is_online"],
+                "enduser_last_login": row[f"{user}__last_login"],
+                "enduser_last_session_login": row[
+                    "dest_last_session" if row["is_parent"] else "src_last_session"
+                ],
+                "enduser_role": row[f"{user}__end_user__role"],
+                "enduser_email": row[f"{user}__email"],
+                "enduser_company": row[f"{user}__end_user__company"],
+                "enduser_sessions": row[f"{user}__end_user__total_sessions"],
+                "enduser_trail_type": row[f"{user}__end_user__trial_type"],
+                "enduser_linkedin": row[f"{user}__end_user__linkedin"],
+                "enduser_is_new": (
+                    row[f"{user}__end_user__is_new"] if has_end_user else False
+                ),
+                "enduser_checkin_status": (
+                    row[f"{user}__end_user__check_in_status"] if has_end_user else False
+                ),
+                "storage_url": row["storage_url"],
+                "is_seen_enduser": row["is_seen_enduser"],
+                "is_played": row["is_played"],
+                "is_unread": row["is_unread"],
+                "name": row["name"] or None,
+                "sub_event_type": row["sub_event_type"],
+                "enduser_phone": row[f"{user}__phone"],
+                "modified_at": modified_at_field.to_representation(row["modified_at"]),
+            }
+        )
+    return data
+
+
+class EventUsernameListSerializer(serializers.ListSerializer):
+    """
+    Loads the usernames of the users of all the events in one query, into the
+    "usernames" context of CustomEventSerializer.
+    """
+
+    def to_representation(self, data):
+        events = data.all() if isinstance(data, models.manager.BaseManager) else data
+        events = list(events)
+
+        user_ids = {
+            user_id
+            for event in events
+            for user_id in (event.source_user_id, event.destination_user_id)
+            if user_id
+        }
+        usernames = self.context.setdefault("usernames", {})
+        user_ids.difference_update(usernames)
+        if user_ids:
+            # Users that do not exist anymore are not looked up again
+            usernames.update(dict.fromkeys(user_ids))
+            usernames.update(
+                User.objects.filter(id__in=user_ids).values_list("id", "first_name")
+            )
+
+        return super().to_representation(events)
+
+
 class CustomEventSerializer(serializers.ModelSerializer):
 
     event_type = serializers.SerializerMethodField()
@@ -301,19 +402,23 @@ class CustomEventSerializer(serializers.ModelSerializer):
     def get_is_parent(self, obj):
         return obj.is_parent
 
+    def get_username(self, user_id):
+        if not user_id:
+            return ""
+        usernames = self.context.setdefault("usernames", {})
+        if user_id not in usernames:
+            usernames[user_id] = (
+                User.objects.filter(id=user_id)
+                .values_list("first_name", flat=True)
+                .first()
+            )
+        return usernames[user_id]
+
     def get_source_username(self, obj):
-        if obj.source_user_id:
-            username = User.objects.filter(id=obj.source_user_id).first().first_name
-            return username
-        return ""
+        return self.get_username(obj.source_user_id)
 
     def get_destination_username(self, obj):
-        if obj.destination_user_id:
-            username = (
-                User.objects.filter(id=obj.destination_user_id).first().first_name
-            )
-            return username
-        return ""
+        return self.get_username(obj.destination_user_id)
 
     def get_timestamp(self, obj):
         return obj.timestamp
@@ -338,6 +443,7 @@ class CustomEventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
+        list_serializer_class = EventUsernameListSerializer
         fields = [
             "event_type",
             "source_user_id",
@@ -9,6 +9,7 @@ urlpatterns = [
         views.EventListTypeAPIView.as_view(),
         name="list_events",
     ),
+    path("sync_events", views.EventSyncAPIView.as_view(), name="sync_events"),
     path("unseen_events", views.UnseenEventsAPIView.as_view(), name="update_events"),
     path(
         "list_events_public",
@@ -1,5 +1,6 @@
 from django.db.models import Prefetch, OuterRef, Subquery, Max
 from home.models import EndUserSession
+from .models import Event
 
 
 def optimize_event_queryset(queryset):
@@ -7,22 +8,96 @@ def optimize_event_queryset(queryset):
     Optimizes the queryset for `Event` model to reduce the number of database queries
     when accessing related user data and their sessions.
     """
-    last_session_subquery = (
-        EndUserSession.objects.filter(end_user=OuterRef("pk"))
-        .order_by("-modified_at")
-        .values("last_session_active")[:1]
-    )
-
     queryset = (
         queryset.select_related("src_user__end_user", "dest_user__end_user")
         .prefetch_related(
             Prefetch("src_user__end_user__sessions"),
             Prefetch("dest_user__end_user__sessions"),
         )
-        .annotate(
-            src_last_session=Subquery(last_session_subquery),
-            dest_last_session=Subquery(last_session_subquery),
-        )
+        .annotate(**get_last_session_annotations())
     )
 
     return queryset
+
+
+def get_last_session_annotations():
+    last_session_subquery = (
+        EndUserSession.objects.filter(end_user=OuterRef("pk"))
+        .order_by("-modified_at")
+        .values("last_session_active")[:1]
+    )
+    return {
+        "src_last_session": Subquery(last_session_subquery),
+        "dest_last_session": Subquery(last_session_subquery),
+    }
+
+
+# Columns of the events, and of both of their users, read by
+# serialize_event_rows
+EVENT_ROW_COLUMNS = [
+    "id",
+    "event_type",
+    "source_user_id",
+    "destination_user_id",
+    "status",
+    "duration",
+    "frontend_screen",
+    "request_meta",
+    "error_stack_trace",
+    "agent_name",
+    "initiated_by",
+    "interaction_type",
+    "interaction_id",
+    "is_parent",
+    "timestamp",
+    "storage_url",
+    "is_seen_enduser",
+    "is_played",
+    "is_unread",
+    "name",
+    "sub_event_type",
+    "modified_at",
+]
+EVENT_ROW_USER_COLUMNS = [
+    "id",
+    "first_name",
+    "last_name",
+    "is_online",
+    "last_login",
+    "email",
+    "phone",
+    "end_user__role",
+    "end_user__company",
+    "end_user__total_sessions",
+    "end_user__trial_type",
+    "end_user__linkedin",
+    "end_user__is_new",
+    "end_user__check_in_status",
+]
+
+
+def get_event_rows(queryset):
+    """
+    Projects events and their users into flat dicts with a single query, the
+    fast path of CustomEventSerializerV1, see serialize_event_rows.
+    """
+    columns = [*EVENT_ROW_COLUMNS, "src_last_session", "dest_last_session"]
+    for user in ("src_user", "dest_user"):
+        columns += [f"{user}__{column}" for column in EVENT_ROW_USER_COLUMNS]
+    return queryset.annotate(**get_last_session_annotations()).values(*columns)
+
+
+def get_enduser_events(end_user_id):
+    """
+    Returns the events an end user is the source or the destination of.
+
+    An OR of both columns cannot be served by one index and ends up scanning
+    the table, so each half goes through its own index and they are combined
+    with a UNION ALL, the second half leaving out the rows of the first.
+    """
+    return Event.objects.filter(source_user_id=end_user_id).union(
+        Event.objects.filter(destination_user_id=end_user_id).exclude(
+            source_user_id=end_user_id
+        ),
+        all=True,
+    )
@@ -1,16 +1,17 @@
 from django.shortcuts import render
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from .models import Event
-from .serializers import EventSerializer, CustomEventSerializer, CustomEventSerializerV1
+from .pagination import EventCursorPagination, EventSyncPagination
+from .serializers import EventSerializer, CustomEventSerializer, serialize_event_rows
 from infra_utils.views import CustomGenericAPIView, CustomGenericAPIListView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Q
 from user.models import Organization
 from infra_utils.utils import encode_base64
 from pusher_channel_app.utils import publish_event_to_user
-from .utils import optimize_event_queryset
+from .utils import get_enduser_events, get_event_rows
 
 import logging
 
@@ -34,15 +35,14 @@ class EventListAPIView(CustomGenericAPIListView):
     def get(self, request, *args, **kwargs):
         user = request.user
         endUserId = request.query_params.get("endUserId")
-        events = Event.objects.filter(
-            Q(source_user_id=endUserId) | Q(destination_user_id=endUserId)
-        )
+        events = get_enduser_events(endUserId)
         serializer = CustomEventSerializer(events, many=True)
         return Response(serializer.data)
 
 
 class EventListTypeAPIView(CustomGenericAPIListView):
     permission_classes = (IsAuthenticated,)
+    pagination_class = EventCursorPagination
 
     def get(self, request, type, *args, **kwargs):
         user = request.user
@@ -54,11 +54,30 @@ class EventListTypeAPIView(CustomGenericAPIListView):
             events = Event.objects.filter(
                 organization=organization,
             )
-            optimized_queryset = optimize_event_queryset(events)
-            serializer = CustomEventSerializerV1(optimized_queryset, many=True)
-            return Response(serializer.data)
+            page = self.paginate_queryset(get_event_rows(events))
+            return self.get_paginated_response(serialize_event_rows(page))
         else:
-            Response({"error": "Invalid type"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                {"error": "Invalid type"}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+
+class EventSyncAPIView(CustomGenericAPIListView):
+    """
+    Events of the organization created or changed since the `since`
+    watermark of a previous response, read state changes included.
+    Without `since` it starts from the first event.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    pagination_class = EventSyncPagination
+
+    def get(self, request, *args, **kwargs):
+        organization = request.user.client.organization
+
+        events = Event.objects.filter(organization=organization)
+        page = self.paginate_queryset(get_event_rows(events))
+        return self.get_paginated_response(serialize_event_rows(page))
 
 
 class UnseenEventsAPIView(CustomGenericAPIView):
@@ -92,7 +111,7 @@ class UnseenEventsAPIView(CustomGenericAPIView):
         try:
             event = Event.objects.filter(
                 organization=organization, source_user_id=endUserId
-            ).update(is_unread=False)
+            ).update(is_unread=False, modified_at=timezone.now())
             return Response(
                 {"message": f"All Events marked as read <-> {event}"},
                 status=status.HTTP_200_OK,
@@ -124,9 +143,7 @@ class EventListPublicAPIView(CustomGenericAPIListView):
                 status=status.HTTP_404_NOT_FOUND,
             )
         endUserId = request.query_params.get("endUserId")
-        events = Event.objects.filter(
-            Q(source_user_id=endUserId) | Q(destination_user_id=endUserId)
-        )
+        events = get_enduser_events(endUserId)
         serializer = CustomEventSerializer(events, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -233,7 +250,7 @@ class EventPublicAPIView(CustomGenericAPIView):
                     "WE_SENT_AUDIO_NOTE",
                     "SENT_US_AUDIO_NOTE",
                 ],
-            ).update(is_seen_enduser=True)
+            ).update(is_seen_enduser=True, modified_at=timezone.now())
         elif interactionId and not updateType:
             event = Event.objects.filter(interaction_id=interactionId).first()
             if not event:
@@ -2,9 +2,11 @@ from django.urls import path
 from . import views
 
 from .views import HealthCheckView  # Import the HealthCheckView class
+from .views import WebsocketMetricsView
 
 urlpatterns = [
     path(
         "ping", HealthCheckView.as_view(), name="health-check"
     ),  # Use HealthCheckView as the view argument
+    path("websockets", WebsocketMetricsView.as_view(), name="websocket-metrics"),
 ]
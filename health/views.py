@@ -1,7 +1,9 @@
 from django.shortcuts import render
 from rest_framework.response import Response
 from infra_utils.views import CustomGenericAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
+
+import os
 
 # Create your views here.
 
@@ -11,3 +13,23 @@ class HealthCheckView(CustomGenericAPIView):
 
     def get(self, request, *args, **kwargs):
         return Response({"status": "ok"}, status=200)
+
+
+class WebsocketMetricsView(CustomGenericAPIView):
+    """
+    Websocket admission counts, for staff users only.
+
+    The figures cover the single process serving the request, not the whole
+    deployment: each worker admits its own connections, and `pid` tells which
+    one answered.
+    """
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        from websocket.middleware import ConnectionAdmission
+
+        # Counts of the process serving the request
+        metrics = ConnectionAdmission.get_instance().get_metrics()
+        metrics["pid"] = os.getpid()
+        return Response(metrics, status=200)
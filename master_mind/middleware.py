@@ -19,7 +19,8 @@ class TimingMiddleware(MiddlewareMixin):
             method = request.method
             path = request.path
             status_code = response.status_code
-            response_length = len(response.content)
+            # Streaming responses are sent after the middlewares ran
+            response_length = "-" if response.streaming else len(response.content)
 
             # Using f-string for formatting the log message
             message = f'[{current_time}] "{method} {path} HTTP/1.1" {status_code} {response_length} {duration:.2f}Seconds'
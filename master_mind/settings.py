@@ -300,6 +300,10 @@ PUSHER_APP_ID = os.getenv("PUSHER_APP_ID")
 PUSHER_KEY = os.getenv("PUSHER_KEY")
 PUSHER_SECRET = os.getenv("PUSHER_SECRET")
 PUSHER_CLUSTER = os.getenv("PUSHER_CLUSTER")
+PUSHER_POOL_SIZE = int(
+    os.getenv("PUSHER_POOL_SIZE", 20)
+)  # connections the async pusher client keeps per process
+PUSHER_KEEPALIVE_TIMEOUT = int(os.getenv("PUSHER_KEEPALIVE_TIMEOUT", 60))  # seconds
 
 # Dyte config
 DYTE_ORG_ID = os.getenv("DYTE_ORG_ID")
@@ -348,9 +352,111 @@ REVERSE_CONTACT_BASE_URL = os.getenv("REVERSE_CONTACT_BASE_URL")
 JUNE_API_KEY = os.getenv("JUNE_API_KEY")
 
 
+# WEBSOCKET
+WEBSOCKET_TOKEN_CACHE_TTL = int(
+    os.getenv("WEBSOCKET_TOKEN_CACHE_TTL", 300)
+)  # seconds an organization token stays cached
+WEBSOCKET_TOKEN_CACHE_SIZE = int(os.getenv("WEBSOCKET_TOKEN_CACHE_SIZE", 10000))
+WEBSOCKET_MAX_CONNECTIONS = int(
+    os.getenv("WEBSOCKET_MAX_CONNECTIONS", 5000)
+)  # open websockets per process, 0 disables
+WEBSOCKET_MAX_CONNECTIONS_PER_ORG = int(
+    os.getenv("WEBSOCKET_MAX_CONNECTIONS_PER_ORG", 1000)
+)  # open websockets of one organization per process, 0 disables
+WEBSOCKET_PING_INTERVAL = int(os.getenv("WEBSOCKET_PING_INTERVAL", 20))  # seconds
+WEBSOCKET_IDLE_TIMEOUT = int(
+    os.getenv("WEBSOCKET_IDLE_TIMEOUT", 60)
+)  # seconds without any frame before a connection is closed, 0 disables
+
 # REDIS
 REDIS_HOST = os.getenv("REDIS_HOST")
 REDIS_PORT = os.getenv("REDIS_PORT")
 
 # SESSION IGNORE
 SESSION_IGNORE_USER_IDS = list(os.getenv("SESSION_IGNORE_USER_IDS", "").split(","))
+
+# SESSION RECORDING
+SESSION_UPLOAD_BLOCK_SIZE = int(
+    os.getenv("SESSION_UPLOAD_BLOCK_SIZE", 4 * 1024 * 1024)
+)  # bytes per staged block
+SESSION_DRAIN_BATCH_SIZE = int(os.getenv("SESSION_DRAIN_BATCH_SIZE", 500))
+SESSION_FLUSH_INTERVAL = float(
+    os.getenv("SESSION_FLUSH_INTERVAL", 1)
+)  # seconds between two flushes of the event buffers
+SESSION_FLUSH_MAX_BATCH_SIZE = int(
+    os.getenv("SESSION_FLUSH_MAX_BATCH_SIZE", 5000)
+)  # events per pipelined Redis round trip
+SESSION_CHECKPOINT_INTERVAL = int(
+    os.getenv("SESSION_CHECKPOINT_INTERVAL", 30)
+)  # seconds, 0 disables checkpointing
+SESSION_VIEWERS_TTL = int(
+    os.getenv("SESSION_VIEWERS_TTL", 12 * 60 * 60)
+)  # seconds a viewer set outlives its last viewer connect
+SESSION_HEARTBEAT_INTERVAL = int(
+    os.getenv("SESSION_HEARTBEAT_INTERVAL", 30)
+)  # seconds between two refreshes of the live sessions last seen scores
+SESSION_REAPER_IDLE_TIMEOUT = int(
+    os.getenv("SESSION_REAPER_IDLE_TIMEOUT", 15 * 60)
+)  # seconds without a heartbeat before a session is finalized by the reaper
+SESSION_REAPER_LOCK_TIMEOUT = int(
+    os.getenv("SESSION_REAPER_LOCK_TIMEOUT", 5 * 60)
+)  # seconds a session finalize lock is held at most
+SESSION_LOCK_WAIT = int(
+    os.getenv("SESSION_LOCK_WAIT", 10)
+)  # seconds a connection waits for the lock of its session to resume or save it
+SESSION_STORAGE_MODE = os.getenv(
+    "SESSION_STORAGE_MODE", "list"
+)  # "list", or "stream" to leave saving the sessions to the finalizers
+SESSION_STREAM_MAXLEN = int(
+    os.getenv("SESSION_STREAM_MAXLEN", 200000)
+)  # events recorded at most per session in the stream mode, later ones are only live
+SESSION_FINALIZER_BATCH_SIZE = int(os.getenv("SESSION_FINALIZER_BATCH_SIZE", 10))
+SESSION_FINALIZER_CLAIM_IDLE = int(
+    os.getenv("SESSION_FINALIZER_CLAIM_IDLE", 5 * 60)
+)  # seconds before the pending job of a failed finalizer is retried
+SESSION_FINALIZER_MAX_ATTEMPTS = int(os.getenv("SESSION_FINALIZER_MAX_ATTEMPTS", 5))
+SESSION_EVENT_RATE = float(
+    os.getenv("SESSION_EVENT_RATE", 200)
+)  # events per second a session buffers before shedding, 0 disables
+SESSION_EVENT_BURST = int(os.getenv("SESSION_EVENT_BURST", 2000))
+SESSION_BACKPRESSURE_POLICY = os.getenv(
+    "SESSION_BACKPRESSURE_POLICY", "coalesce"
+)  # "coalesce", "drop" or "sample"
+SESSION_BACKPRESSURE_SAMPLE_EVERY = int(
+    os.getenv("SESSION_BACKPRESSURE_SAMPLE_EVERY", 10)
+)  # events kept out of every this many with the "sample" policy
+SESSION_MAX_BUFFERED_EVENTS = int(
+    os.getenv("SESSION_MAX_BUFFERED_EVENTS", 20000)
+)  # events waiting for the flusher before all but keyframes are dropped
+SESSION_MAX_FRAME_SIZE = int(
+    os.getenv("SESSION_MAX_FRAME_SIZE", 16 * 1024 * 1024)
+)  # bytes a binary frame may inflate to, larger ones are dropped
+SESSION_CATCH_UP_MAX_EVENTS = int(
+    os.getenv("SESSION_CATCH_UP_MAX_EVENTS", 10000)
+)  # events since the last full snapshot kept for viewers joining mid-session
+SESSION_CATCH_UP_TTL = int(os.getenv("SESSION_CATCH_UP_TTL", 60 * 60))  # seconds
+SESSION_CATCH_UP_TIMEOUT = float(
+    os.getenv("SESSION_CATCH_UP_TIMEOUT", 2)
+)  # seconds a joining viewer waits for the enduser before catching up anyway
+SESSION_RESUME_GRACE = int(
+    os.getenv("SESSION_RESUME_GRACE", 30)
+)  # seconds a disconnected widget has to resume its session before it is saved
+SESSION_CHUNK_SIZE = int(
+    os.getenv("SESSION_CHUNK_SIZE", 0)
+)  # bytes per recording chunk, 0 uploads each recording as a single blob
+SESSION_BLOB_ENCODING = os.getenv(
+    "SESSION_BLOB_ENCODING", ""
+)  # "", "gzip", or "zstd" when zstandard is installed
+SESSION_BLOB_GZIP_LEVEL = int(os.getenv("SESSION_BLOB_GZIP_LEVEL", 6))
+SESSION_BLOB_ZSTD_LEVEL = int(os.getenv("SESSION_BLOB_ZSTD_LEVEL", 3))
+SESSION_POLICY_CACHE_TTL = int(
+    os.getenv("SESSION_POLICY_CACHE_TTL", 60)
+)  # seconds an organization recording policy stays cached
+SESSION_POLICY_CACHE_SIZE = int(os.getenv("SESSION_POLICY_CACHE_SIZE", 10000))
+EVENT_PAGE_SIZE = int(os.getenv("EVENT_PAGE_SIZE", 50))  # events per feed page
+EVENT_MAX_PAGE_SIZE = int(
+    os.getenv("EVENT_MAX_PAGE_SIZE", 200)
+)  # largest page_size a client can ask for
+EVENT_SYNC_SETTLE = int(
+    os.getenv("EVENT_SYNC_SETTLE", 5)
+)  # seconds of event changes sent again to the next sync, for late commits
@@ -5,9 +5,13 @@ from rest_framework import status
 from pusher_channel_app.models import (
     PusherChannelApp,
 )
+from pusher.http import process_response
+import aiohttp
+import asyncio
 import threading
 import logging
 import pusher
+import weakref
 
 logger = logging.getLogger("django")
 
@@ -50,6 +54,81 @@ class PusherClientSingleton:
         logger.info(f"Pusher message publish task scheduled with ID: {task_id}")
 
 
+class AioHTTPBackend:
+    """
+    pusher backend sending the requests, signed by the pusher client, through
+    one aiohttp session per event loop so that connections are kept alive.
+    """
+
+    def __init__(self, client, **options):
+        self.client = client
+        # Keyed weakly, the loops that are gone are dropped along with their
+        # session
+        self.sessions = weakref.WeakKeyDictionary()
+        self.closers = set()
+
+    def get_session(self):
+        loop = asyncio.get_running_loop()
+        session = self.sessions.get(loop)
+        if session is None or session.closed:
+            if session is None:
+                # asyncio.run and async_to_sync cancel the tasks left on their
+                # loop before closing it, the session is closed by this one
+                closer = loop.create_task(self.close_session(loop))
+                self.closers.add(closer)
+                closer.add_done_callback(self.closers.discard)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=settings.PUSHER_POOL_SIZE,
+                    keepalive_timeout=settings.PUSHER_KEEPALIVE_TIMEOUT,
+                ),
+                timeout=aiohttp.ClientTimeout(total=self.client.timeout),
+            )
+            self.sessions[loop] = session
+        return session
+
+    async def close_session(self, loop):
+        try:
+            # Waits for the shutdown of the loop
+            await loop.create_future()
+        finally:
+            session = self.sessions.pop(loop, None)
+            if session is not None:
+                await session.close()
+
+    async def send_request(self, request):
+        async with self.get_session().request(
+            request.method,
+            f"{request.base_url}{request.path}",
+            params=request.query_params,
+            data=request.body,
+            headers=request.headers,
+        ) as response:
+            body = await response.text("utf-8")
+        return process_response(response.status, body)
+
+
+class AsyncPusherClient:
+    """
+    Pusher client for the async code, its methods return coroutines.
+    """
+
+    _instance = None
+
+    @classmethod
+    def get_client(cls):
+        if cls._instance is None:
+            cls._instance = pusher.Pusher(
+                app_id=settings.PUSHER_APP_ID,
+                key=settings.PUSHER_KEY,
+                secret=settings.PUSHER_SECRET,
+                cluster=settings.PUSHER_CLUSTER,
+                ssl=True,
+                backend=AioHTTPBackend,
+            )
+        return cls._instance
+
+
 def publish_event_to_pusher(organization, data, request_meta):
     pusher_app_obj = PusherChannelApp.objects.filter(organization=organization).first()
     if not pusher_app_obj:
@@ -115,6 +194,22 @@ def publish_event_to_user(
         logger.exception(f"Failed to publish event to user -- {str(e)}")
 
 
+async def apublish_event_to_user(
+    channel_name: str,
+    channel_type: str,
+    user_id: str,
+    event_type: str,
+    data: dict[str, str] = {},
+) -> None:
+    pusher_client = AsyncPusherClient.get_client()
+    channel = f"{channel_type}-{channel_name}-{user_id}"
+    try:
+        await pusher_client.trigger(channel, event_type, data)
+
+    except Exception as e:
+        logger.exception(f"Failed to publish event to user -- {str(e)}")
+
+
 def publish_event_to_channel(
     channel_name: str,
     channel_type: str,
@@ -14,6 +14,7 @@ from .models import (
     FeatureFlagConnect,
     ClientBanner,
     CheckInFeature,
+    SessionRecordingPolicy,
 )
 
 # Register your models here.
@@ -91,3 +92,8 @@ class ClientBannerAdmin(ModelAdmin):
 @admin.register(CheckInFeature)
 class CheckInFeatureAdmin(ModelAdmin):
     list_display = ("organization", "master_switch", "skip_switch", "support_email")
+
+
+@admin.register(SessionRecordingPolicy)
+class SessionRecordingPolicyAdmin(ModelAdmin):
+    list_display = ("organization", "sample_rate", "max_session_length")
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:37
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0039_alter_user_phone"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="organization",
+            name="token",
+            field=models.UUIDField(db_index=True, default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0040_alter_organization_token"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserSessionMetadata",
+            fields=[
+                (
+                    "deleted",
+                    models.DateTimeField(db_index=True, editable=False, null=True),
+                ),
+                (
+                    "deleted_by_cascade",
+                    models.BooleanField(default=False, editable=False),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, null=True, verbose_name="Created Date"
+                    ),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        null=True,
+                        verbose_name="Modified Date",
+                    ),
+                ),
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="metadata",
+                        serialize=False,
+                        to="user.usersession",
+                    ),
+                ),
+                ("started_at", models.BigIntegerField(blank=True, null=True)),
+                ("ended_at", models.BigIntegerField(blank=True, null=True)),
+                ("duration", models.BigIntegerField(db_index=True, default=0)),
+                ("event_count", models.IntegerField(db_index=True, default=0)),
+                ("event_counts", models.JSONField(blank=True, default=dict)),
+                ("byte_size", models.BigIntegerField(default=0)),
+                ("page_count", models.IntegerField(db_index=True, default=0)),
+                ("urls", models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
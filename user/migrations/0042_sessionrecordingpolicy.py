@@ -0,0 +1,71 @@
+# Generated by Django 4.2.10 on 2026-10-18 06:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("user", "0041_usersessionmetadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionRecordingPolicy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "deleted",
+                    models.DateTimeField(db_index=True, editable=False, null=True),
+                ),
+                (
+                    "deleted_by_cascade",
+                    models.BooleanField(default=False, editable=False),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, null=True, verbose_name="Created Date"
+                    ),
+                ),
+                (
+                    "modified_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        db_index=True,
+                        null=True,
+                        verbose_name="Modified Date",
+                    ),
+                ),
+                ("sample_rate", models.FloatField(default=1.0)),
+                ("ignored_user_ids", models.JSONField(blank=True, default=list)),
+                ("ignored_emails", models.JSONField(blank=True, default=list)),
+                ("allowed_url_patterns", models.JSONField(blank=True, default=list)),
+                ("denied_url_patterns", models.JSONField(blank=True, default=list)),
+                (
+                    "max_session_length",
+                    models.PositiveIntegerField(blank=True, null=True),
+                ),
+                (
+                    "organization",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="session_recording_policy",
+                        to="user.organization",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
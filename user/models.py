@@ -169,7 +169,9 @@ class Organization(CreatedModifiedModel):
     name = models.CharField(max_length=256)
     country = models.CharField(max_length=256, blank=True, default="")
     website = models.CharField(max_length=256, blank=True, default="")
-    token = models.UUIDField(max_length=64, default=uuid.uuid4, editable=False)
+    token = models.UUIDField(
+        max_length=64, default=uuid.uuid4, editable=False, db_index=True
+    )
     auto_send_welcome_note = models.BooleanField(default=True)
     auto_sent_after = models.CharField(
         max_length=5, blank=True, default="30", null=True
@@ -482,3 +484,54 @@ class UserSession(CreatedModifiedModel):
 
     def __str__(self):
         return self.session_id
+
+
+class UserSessionMetadata(CreatedModifiedModel):
+    """
+    Summary of a session recording, built while the events come in so that
+    recordings can be filtered and sorted without opening their blob.
+    Timestamps and the duration are rrweb timestamps, in milliseconds.
+    """
+
+    session = models.OneToOneField(
+        UserSession,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name="metadata",
+    )
+    started_at = models.BigIntegerField(null=True, blank=True)
+    ended_at = models.BigIntegerField(null=True, blank=True)
+    duration = models.BigIntegerField(default=0, db_index=True)
+    event_count = models.IntegerField(default=0, db_index=True)
+    # Number of events of each rrweb type, keyed by the type
+    event_counts = models.JSONField(default=dict, blank=True)
+    byte_size = models.BigIntegerField(default=0)
+    page_count = models.IntegerField(default=0, db_index=True)
+    urls = models.JSONField(default=list, blank=True)
+
+    def __str__(self):
+        return self.session_id
+
+
+class SessionRecordingPolicy(CreatedModifiedModel):
+    """
+    Which sessions of an organization are recorded. URL patterns are shell
+    style wildcards matched against the URL of the page the widget is on.
+    """
+
+    organization = models.OneToOneField(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="session_recording_policy",
+    )
+    # Fraction of the sessions recorded, between 0 and 1
+    sample_rate = models.FloatField(default=1.0)
+    ignored_user_ids = models.JSONField(default=list, blank=True)
+    ignored_emails = models.JSONField(default=list, blank=True)
+    allowed_url_patterns = models.JSONField(default=list, blank=True)
+    denied_url_patterns = models.JSONField(default=list, blank=True)
+    # Seconds of a session recorded at most, none for no limit
+    max_session_length = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return self.organization.name
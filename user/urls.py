@@ -64,6 +64,16 @@ urlpatterns = [
     path("enduser/init", views.InitEndUserView.as_view(), name="init-enduser"),
     path("enduser/exit", views.ExitEndUserView.as_view(), name="exit-enduser"),
     path("enduser/session", views.EndUserSessionView.as_view(), name="exit-enduser"),
+    path(
+        "enduser/session/playback",
+        views.EndUserSessionPlaybackView.as_view(),
+        name="enduser-session-playback",
+    ),
+    path(
+        "enduser/session/recording",
+        views.EndUserSessionRecordingView.as_view(),
+        name="enduser-session-recording",
+    ),
     path("client", views.ClientView.as_view(), name="client-list"),
     # not completely done
     path("register/", views.RegistrationView.as_view(), name="register"),
@@ -4,7 +4,7 @@ from django_q.tasks import async_task, schedule
 from django_q.models import Schedule
 from django.utils import timezone
 from datetime import timedelta, datetime, UTC
-from user.models import User, Organization
+from user.models import User, Organization, UserSession
 from pusher_channel_app.utils import publish_event_to_client
 from functools import lru_cache
 from user.constants import COMPLETED, PENDING, SKIPPED, NOT_APPLICABLE
@@ -252,6 +252,19 @@ class LinkedIn:
         logger.info(f"LinkedIn URL fetch task is scheduled with task ID: {task_id}")
 
 
+def get_organization_session(user, session_id):
+    """
+    Returns the session `session_id` if it was recorded for an end user of
+    the organization of the client `user`, None otherwise.
+    """
+    client = getattr(user, "client", None)
+    if client is None or client.organization_id is None:
+        return None
+    return UserSession.objects.filter(
+        session_id=session_id, user__end_user__organization=client.organization_id
+    ).first()
+
+
 def is_request_within_office_hours(organization):
     # Get the current time in UTC
     now_utc = timezone.now()
@@ -16,6 +16,7 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from .utils import (
     Mail,
+    get_organization_session,
     remove_spaces_from_text,
     schedule_active_status_for_client,
     validate_check_in_status,
@@ -67,6 +68,8 @@ from infra_utils.views import (
 from infra_utils.utils import password_rule_check, generate_strong_password
 from django.db.models import Q, Prefetch
 from django.shortcuts import redirect
+from django.http import StreamingHttpResponse
+from asgiref.sync import async_to_sync
 from .constants import (
     get_integration_code_snippet,
     get_new_app_signup_slack_block_template_part_1,
@@ -84,6 +87,14 @@ from django.utils import timezone
 from user.tasks import send_slack_blocks_async
 from dyte.utils import replace_special_chars
 from events.models import Event
+from websocket.live_sessions.playback import (
+    get_blob_read_url,
+    get_playback_chunks,
+    is_chunked_recording,
+    load_manifest,
+    open_recording,
+    sign_playback_chunks,
+)
 from home.event_types import SUCCESS, AUTOMATIC, VOICE_NOTE, MANUAL
 
 import logging
@@ -1324,6 +1335,127 @@ class EndUserSessionView(CustomGenericAPIView):
             )
 
 
+class EndUserSessionPlaybackView(CustomGenericAPIView):
+    """
+    Returns the chunks of a session recording needed to start playing it at
+    `t`, milliseconds from its start, together with the keyframe to start from.
+    The urls are signed for reading for a few minutes.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        session_id = request.query_params.get("session_id", None)
+
+        try:
+            offset = int(request.query_params.get("t", 0))
+        except ValueError:
+            return Response(
+                {"message": "t must be a number of milliseconds"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        session_obj = get_organization_session(request.user, session_id)
+        if not session_obj or not session_obj.storage_url:
+            return Response(
+                {"message": "Session not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Recordings uploaded as a single blob are played from the start
+        if not is_chunked_recording(session_obj.storage_url):
+            return Response(
+                {
+                    "session_id": session_obj.session_id,
+                    "keyframe": None,
+                    "chunks": [
+                        {"index": 0, "url": get_blob_read_url(session_obj.storage_url)}
+                    ],
+                    "chunk_count": 1,
+                },
+                status=status.HTTP_200_OK,
+            )
+
+        try:
+            manifest = load_manifest(session_obj.storage_url)
+        except Exception as e:
+            logger.error(f"Error while loading the manifest of {session_id}: {e}")
+            return Response(
+                {"message": "Recording not available"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        keyframe, chunks = get_playback_chunks(manifest, offset)
+        return Response(
+            {
+                "session_id": session_obj.session_id,
+                "manifest_url": get_blob_read_url(session_obj.storage_url),
+                "start": manifest["start"],
+                "duration": manifest["duration"],
+                "keyframe": keyframe,
+                "chunks": sign_playback_chunks(chunks),
+                "chunk_count": len(manifest["chunks"]),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class EndUserSessionRecordingView(CustomGenericAPIView):
+    """
+    Streams a session recording, or its chunk `chunk` when it is chunked,
+    compressed to the clients accepting the encoding it is stored with.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def get(self, request):
+        session_id = request.query_params.get("session_id", None)
+        try:
+            index = int(request.query_params.get("chunk", 0))
+        except ValueError:
+            return Response(
+                {"message": "chunk must be a number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        session_obj = get_organization_session(request.user, session_id)
+        if not session_obj or not session_obj.storage_url:
+            return Response(
+                {"message": "Session not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        try:
+            url = session_obj.storage_url
+            if is_chunked_recording(url):
+                chunks = load_manifest(url)["chunks"]
+                if not 0 <= index < len(chunks):
+                    return Response(
+                        {"message": "Chunk not found"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                url = chunks[index]["url"]
+
+            # Opened on the event loop of the server, which iterates the
+            # content, so that the response is streamed and not buffered
+            content, encoding, close = async_to_sync(open_recording)(
+                url, request.META.get("HTTP_ACCEPT_ENCODING", "")
+            )
+        except Exception as e:
+            logger.error(f"Error while opening the recording of {session_id}: {e}")
+            return Response(
+                {"message": "Recording not available"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        response = StreamingHttpResponse(content, content_type="application/json")
+        # The content closes the connection once iterated, the response
+        # closes it when the client goes away before
+        response._resource_closers.append(async_to_sync(close))
+        if encoding:
+            response["Content-Encoding"] = encoding
+        response["Vary"] = "Accept-Encoding"
+        return response
+
+
 class ClientView(CustomGenericAPIView):
     permission_classes = (permissions.IsAuthenticated,)
 
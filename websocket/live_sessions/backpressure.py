@@ -0,0 +1,129 @@
+from collections import Counter
+from django.conf import settings
+from websocket.live_sessions.rrweb import (
+    CANVAS_MUTATION,
+    CUSTOM,
+    DRAG,
+    INCREMENTAL_SNAPSHOT,
+    LOG,
+    MOUSE_MOVE,
+    SCROLL,
+    TOUCH_MOVE,
+    get_event_kind,
+    is_keyframe,
+)
+
+import logging
+import time
+
+
+logger = logging.getLogger("django")
+
+# Policies applied to the events that come in while the bucket is empty
+COALESCE = "coalesce"
+DROP = "drop"
+SAMPLE = "sample"
+
+# Incremental snapshots only the latest of which matters to a replay
+COALESCED_SOURCES = {MOUSE_MOVE, SCROLL, TOUCH_MOVE}
+
+# Incremental snapshots a replay stays usable without
+LOW_PRIORITY_SOURCES = COALESCED_SOURCES | {CANVAS_MUTATION, LOG, DRAG}
+
+
+class EventRateLimiter:
+    """
+    Token bucket limiting the rate at which a connection buffers events.
+
+    Events are admitted for free while the bucket has tokens. Once it is
+    empty, the events are classified and the policy decides what is kept:
+
+    - coalesce: mouse moves, scrolls and touch moves are held back and only
+      the latest of each is kept, the other events are kept
+    - drop: low priority events are dropped, the other events are kept
+    - sample: one out of every SESSION_BACKPRESSURE_SAMPLE_EVERY events is kept
+
+    Full snapshots and meta events are always kept, and any other event is
+    dropped while more than SESSION_MAX_BUFFERED_EVENTS wait to be flushed.
+    What is shed is counted in `shed`.
+    """
+
+    def __init__(self, rate=None, burst=None, policy=None):
+        self.rate = settings.SESSION_EVENT_RATE if rate is None else rate
+        self.burst = settings.SESSION_EVENT_BURST if burst is None else burst
+        self.policy = policy or settings.SESSION_BACKPRESSURE_POLICY
+        self.sample_every = settings.SESSION_BACKPRESSURE_SAMPLE_EVERY
+        self.max_buffered = settings.SESSION_MAX_BUFFERED_EVENTS
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+        self.overflowed = 0
+        # Latest held back event of each coalesced source
+        self.coalesced = {}
+        self.shed = Counter()
+
+    def take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def admit(self, stored_event, buffered=0):
+        """
+        Returns the events to keep for `stored_event`, in order: nothing, the
+        event itself, or the coalesced events it releases followed by it.
+        `buffered` is the number of events of the connection not flushed yet.
+        """
+        if not self.rate:
+            return [stored_event]
+
+        if buffered < self.max_buffered and self.take_token():
+            return self.release() + [stored_event]
+
+        try:
+            event_type, source = get_event_kind(stored_event)
+        except Exception as e:
+            logger.error(f"Error while reading the event kind: {e}")
+            event_type, source = None, None
+
+        if is_keyframe(event_type):
+            return self.release() + [stored_event]
+
+        if buffered >= self.max_buffered:
+            self.shed["overflow"] += 1
+            return []
+
+        if self.policy == COALESCE:
+            if event_type == INCREMENTAL_SNAPSHOT and source in COALESCED_SOURCES:
+                if source in self.coalesced:
+                    self.shed["coalesced"] += 1
+                self.coalesced[source] = stored_event
+                return []
+            return [stored_event]
+
+        if self.policy == DROP:
+            if event_type == CUSTOM or (
+                event_type == INCREMENTAL_SNAPSHOT and source in LOW_PRIORITY_SOURCES
+            ):
+                self.shed["dropped"] += 1
+                return []
+            return [stored_event]
+
+        # SAMPLE
+        self.overflowed += 1
+        if self.overflowed % self.sample_every:
+            self.shed["sampled"] += 1
+            return []
+        return [stored_event]
+
+    def release(self):
+        """
+        Returns the held back coalesced events, e.g. before the disconnect.
+        """
+        if not self.coalesced:
+            return []
+        events = list(self.coalesced.values())
+        self.coalesced = {}
+        return events
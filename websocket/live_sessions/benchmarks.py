@@ -0,0 +1,161 @@
+from websocket.live_sessions.frames import build_frame, extract_raw_message
+from websocket.live_sessions.rrweb import (
+    FULL_SNAPSHOT,
+    INCREMENTAL_SNAPSHOT,
+    INPUT,
+    META,
+    MOUSE_INTERACTION,
+    MOUSE_MOVE,
+    MUTATION,
+    SCROLL,
+)
+
+import json
+import msgpack
+import random
+import time
+
+
+def _build_node(rng, node_id, depth):
+    node = {
+        "type": 2,
+        "tagName": rng.choice(["div", "span", "section", "li", "a", "p"]),
+        "attributes": {"class": f"css-{rng.randint(0, 9999):04d} item"},
+        "childNodes": [],
+        "id": node_id[0],
+    }
+    node_id[0] += 1
+    if depth:
+        for _ in range(rng.randint(2, 4)):
+            node["childNodes"].append(_build_node(rng, node_id, depth - 1))
+    else:
+        node["childNodes"].append(
+            {"type": 3, "textContent": "Lorem ipsum dolor sit amet", "id": node_id[0]}
+        )
+        node_id[0] += 1
+    return node
+
+
+def generate_rrweb_events(count, seed=0):
+    """
+    Returns `count` synthetic rrweb events with a realistic mix of a meta
+    event, a full snapshot and incremental mutations, mouse moves, clicks,
+    scrolls and inputs.
+    """
+    rng = random.Random(seed)
+    timestamp = 1_700_000_000_000
+
+    events = [
+        {
+            "type": META,
+            "data": {"href": "https://app.example.com/", "width": 1440, "height": 900},
+            "timestamp": timestamp,
+        },
+        {
+            "type": FULL_SNAPSHOT,
+            "data": {
+                "node": _build_node(rng, [1], 5),
+                "initialOffset": {"left": 0, "top": 0},
+            },
+            "timestamp": timestamp + 1,
+        },
+    ]
+
+    while len(events) < count:
+        timestamp += rng.randint(5, 60)
+        source = rng.choices(
+            [MUTATION, MOUSE_MOVE, MOUSE_INTERACTION, SCROLL, INPUT],
+            weights=[30, 45, 10, 10, 5],
+        )[0]
+        if source == MUTATION:
+            data = {
+                "source": MUTATION,
+                "texts": [],
+                "attributes": [
+                    {
+                        "id": rng.randint(1, 500),
+                        "attributes": {"style": f"width: {rng.randint(0, 100)}%;"},
+                    }
+                ],
+                "removes": [],
+                "adds": [
+                    {
+                        "parentId": rng.randint(1, 500),
+                        "nextId": None,
+                        "node": _build_node(rng, [rng.randint(1000, 9000)], 1),
+                    }
+                ],
+            }
+        elif source == MOUSE_MOVE:
+            data = {
+                "source": MOUSE_MOVE,
+                "positions": [
+                    {
+                        "x": rng.randint(0, 1440),
+                        "y": rng.randint(0, 900),
+                        "id": rng.randint(1, 500),
+                        "timeOffset": -offset * 16,
+                    }
+                    for offset in range(rng.randint(1, 10))
+                ],
+            }
+        elif source == MOUSE_INTERACTION:
+            data = {
+                "source": MOUSE_INTERACTION,
+                "type": 2,
+                "id": rng.randint(1, 500),
+                "x": rng.randint(0, 1440),
+                "y": rng.randint(0, 900),
+            }
+        elif source == SCROLL:
+            data = {"source": SCROLL, "id": 1, "x": 0, "y": rng.randint(0, 5000)}
+        else:
+            data = {
+                "source": INPUT,
+                "text": "hello world"[: rng.randint(1, 11)],
+                "isChecked": False,
+                "id": rng.randint(1, 500),
+            }
+        events.append(
+            {"type": INCREMENTAL_SNAPSHOT, "data": data, "timestamp": timestamp}
+        )
+
+    return events[:count]
+
+
+def decode_and_reencode_frame(text_data, viewers):
+    """
+    Ingest path of a frame before the raw passthrough: decode the frame,
+    encode the message for Redis, ship the decoded message through the
+    channel layer and encode it again for every viewer.
+    """
+    message = json.loads(text_data)["message"]
+    buffered = json.dumps(message)
+    packed = msgpack.packb({"type": "session_message", "message": message})
+    for _ in range(viewers):
+        event = msgpack.unpackb(packed)
+        json.dumps({"message": event["message"]})
+    return buffered
+
+
+def passthrough_frame(text_data, viewers):
+    """
+    Ingest path of a frame with the raw passthrough of EndUserConsumer.
+    """
+    raw_message = extract_raw_message(text_data)
+    packed = msgpack.packb({"type": "session_message", "raw_message": raw_message})
+    for _ in range(viewers):
+        event = msgpack.unpackb(packed)
+        build_frame(event["raw_message"])
+    return raw_message
+
+
+def measure_frames_per_second(handler, frames, viewers, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text_data in frames:
+            handler(text_data, viewers)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(frames) / best
@@ -0,0 +1,93 @@
+from django.conf import settings
+from websocket.live_sessions.rrweb import FULL_SNAPSHOT, META, get_event_kind
+
+import logging
+
+
+logger = logging.getLogger("django")
+
+
+class CatchUpBuffer:
+    """
+    Events a viewer joining mid-session needs to render the current page.
+
+    The buffer is anchored at the last full snapshot, together with the meta
+    event rrweb emits right before it, and holds every event since. It lives
+    in a Redis list written by the flusher: `pending` holds the events not
+    written yet and `reset` tells that the list has to be cleared first.
+
+    A buffer growing past SESSION_CATCH_UP_MAX_EVENTS is dropped until the
+    next full snapshot, viewers then ask the widget for a new one instead.
+    """
+
+    def __init__(self, max_events=None):
+        self.max_events = max_events or settings.SESSION_CATCH_UP_MAX_EVENTS
+        self.pending = []
+        self.reset = False
+        self.anchored = False
+        self.length = 0
+        self.last_event_type = None
+
+    @property
+    def dirty(self):
+        return self.reset or bool(self.pending)
+
+    def add(self, stored_event):
+        try:
+            event_type, _ = get_event_kind(stored_event)
+        except Exception as e:
+            logger.error(f"Error while reading the event kind: {e}")
+            event_type = None
+
+        if event_type == META or (
+            event_type == FULL_SNAPSHOT and self.last_event_type != META
+        ):
+            # A new anchor, viewers do not need anything before it
+            self.clear()
+            self.anchored = True
+        self.last_event_type = event_type
+
+        if not self.anchored:
+            return
+
+        if self.length >= self.max_events:
+            self.clear()
+            return
+
+        self.pending.append(stored_event)
+        self.length += 1
+
+    def clear(self):
+        self.pending = []
+        self.reset = True
+        self.anchored = False
+        self.length = 0
+
+    def take(self):
+        """
+        Returns what has to be written to Redis and forgets about it.
+        """
+        taken = (self.reset, self.pending)
+        self.reset = False
+        self.pending = []
+        return taken
+
+    def put_back(self, taken):
+        """
+        Restores what `take` returned after the write to Redis failed.
+        """
+        if self.reset:
+            # Cleared meanwhile, what was taken is not needed anymore
+            return
+        reset, pending = taken
+        self.reset = reset
+        self.pending[:0] = pending
+
+
+def queue_catch_up_write(pipe, catch_up_key, taken):
+    reset, pending = taken
+    if reset:
+        pipe.delete(catch_up_key)
+    if pending:
+        pipe.rpush(catch_up_key, *pending)
+        pipe.expire(catch_up_key, settings.SESSION_CATCH_UP_TTL)
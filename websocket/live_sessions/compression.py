@@ -0,0 +1,96 @@
+from django.conf import settings
+
+import gzip
+import logging
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+logger = logging.getLogger("django")
+
+# Content encodings of the session blobs, "" uploads them uncompressed
+IDENTITY = ""
+GZIP = "gzip"
+ZSTD = "zstd"
+
+
+def get_blob_encoding():
+    encoding = settings.SESSION_BLOB_ENCODING
+    if encoding == ZSTD and zstandard is None:
+        logger.error("zstandard is not installed, session blobs are gzipped")
+        return GZIP
+    if encoding not in (IDENTITY, GZIP, ZSTD):
+        logger.error(f"Unknown session blob encoding {encoding}, not compressing")
+        return IDENTITY
+    return encoding
+
+
+def compress(data, encoding):
+    """
+    Compresses `data` as a complete gzip member or zstd frame. Both formats
+    allow concatenating them, so separately compressed blocks of a blob
+    decompress to the concatenation of the blocks.
+    """
+    if encoding == GZIP:
+        return gzip.compress(
+            data, compresslevel=settings.SESSION_BLOB_GZIP_LEVEL, mtime=0
+        )
+    if encoding == ZSTD:
+        return zstandard.ZstdCompressor(
+            level=settings.SESSION_BLOB_ZSTD_LEVEL
+        ).compress(data)
+    return data
+
+
+def get_decompressor(encoding):
+    if encoding == GZIP:
+        return zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    if encoding == ZSTD:
+        return zstandard.ZstdDecompressor().decompressobj()
+    return None
+
+
+async def iter_decompressed(chunks, encoding):
+    """
+    Decompresses a blob read as an async iterable of bytes, one member or
+    frame after the other.
+    """
+    decompressor = get_decompressor(encoding)
+    if decompressor is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    async for chunk in chunks:
+        while chunk:
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+            if not decompressor.eof:
+                break
+            # The next member starts with what is left of the chunk
+            chunk = decompressor.unused_data
+            decompressor = get_decompressor(encoding)
+
+
+def accepts_encoding(accept_encoding, encoding):
+    """
+    Tells whether an Accept-Encoding header allows `encoding`.
+    """
+    qualities = {}
+    for value in accept_encoding.split(","):
+        name, _, params = value.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, number = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(number)
+                except ValueError:
+                    quality = 0
+        qualities[name.strip().lower()] = quality
+    return qualities.get(encoding, qualities.get("*", 0)) > 0
@@ -1,27 +1,61 @@
-from azure.storage.blob.aio import BlobServiceClient
 from channels.generic.websocket import AsyncWebsocketConsumer
 from datetime import datetime
 from django.conf import settings
 from urllib.parse import parse_qs
 from websocket.utils import RedisPool
+from websocket.live_sessions.backpressure import EventRateLimiter
+from websocket.live_sessions.catch_up import CatchUpBuffer
+from websocket.live_sessions.flusher import EventBufferFlusher
+from websocket.live_sessions.heartbeat import HeartbeatMixin
+from websocket.live_sessions.keys import (
+    LIVE_SESSIONS_KEY,
+    get_catch_up_key,
+    get_events_key,
+    get_session_key,
+    get_stream_key,
+    get_viewers_key,
+)
+from websocket.live_sessions.locks import (
+    acquire_session_lock,
+    release_session_lock,
+    session_lock,
+)
+from websocket.live_sessions.frames import (
+    extract_sequenced_message,
+    outbound_frame,
+    receive_binary_frame,
+    select_subprotocol,
+    to_session_message,
+    to_stored_event,
+)
+from websocket.live_sessions.metadata import SessionMetadata, save_session_metadata
+from websocket.live_sessions.policy import RecordingPolicyCache, fetch_enduser_email
+from websocket.live_sessions.reaper import get_session_writer
+from websocket.live_sessions.storage import (
+    SessionBlobWriter,
+    checkpoint_session,
+    get_session_blob_name,
+)
+from websocket.live_sessions.streams import enqueue_finalize, is_stream_mode
 from asgiref.sync import sync_to_async
 
 
 import json
 import logging
 import asyncio
+import time
 
 
 logger = logging.getLogger("django")
 
 
-class EndUserConsumer(AsyncWebsocketConsumer):
+class EndUserConsumer(HeartbeatMixin, AsyncWebsocketConsumer):
+    # Sessions waiting for their grace window to end before being saved
+    finalize_tasks = set()
+
     async def connect(self):
         try:
             logger.info("Starting connection process")
-            from user.models import UserSession
-
-            self.SESSION_IGNORE_USER_IDS = settings.SESSION_IGNORE_USER_IDS
 
             query_string = parse_qs(self.scope["query_string"].decode())
             token = query_string.get("token", [None])[0]
@@ -34,38 +68,101 @@ class EndUserConsumer(AsyncWebsocketConsumer):
                 f"{self.channel_type}_{self.org_id}_{self.enduser_id}_{self.session_id}"
             )
 
-            self.redis_key = f"events_{self.channel_group_name}"
+            # Events go to a Redis stream in the stream storage mode
+            self.stream_mode = is_stream_mode()
+            if self.stream_mode:
+                self.redis_key = get_stream_key(self.channel_group_name)
+            else:
+                self.redis_key = get_events_key(self.channel_group_name)
+            self.viewers_key = get_viewers_key(self.channel_group_name)
+            self.session_key = get_session_key(self.channel_group_name)
+            self.catch_up_key = get_catch_up_key(self.channel_group_name)
+
+            # Whether the session is recorded is decided once, by the
+            # recording policy of the organization
+            organization = self.scope.get("organization")
+            self.policy = await RecordingPolicyCache.get_instance().get(
+                organization.id if organization else None
+            )
+            self.is_recording = await self.should_record(query_string)
 
             # Use the shared Redis connection pool
             self.redis = await RedisPool.get_instance()
 
+            # Event buffers are written to Redis by the shared flusher
+            self.flusher = await EventBufferFlusher.get_instance()
+
             # Join the end user's private channel
             await self.channel_layer.group_add(
                 self.channel_group_name, self.channel_name
             )
 
-            # Accept the WebSocket connection
-            await self.accept()
+            # Number of clients watching the session, kept up to date by the
+            # viewer_presence messages of ClientConsumer
+            self.viewer_count = await self.redis.scard(self.viewers_key)
+
+            # Accept the WebSocket connection, in the binary protocol if the
+            # widget asked for it
+            self.subprotocol = select_subprotocol(self.scope)
+            await self.accept(subprotocol=self.subprotocol)
 
             # Initialize a local buffer for events
             self.event_buffer = []
-            self.buffer_flush_task = None
-
-            # total duration of the session
-            self.total_duration = 0
-
-            # Check if the enduser_id is in SESSION_IGNORE_USER_IDS
-            if self.enduser_id not in self.SESSION_IGNORE_USER_IDS:
-                # Create a new session object asynchronously without blocking
-                self.session_task = asyncio.create_task(
-                    UserSession.objects.acreate(
-                        session_id=self.session_id,
-                        user_id=self.enduser_id,
-                    )
+            self.rate_limiter = EventRateLimiter()
+
+            # Events since the last full snapshot, for viewers joining later
+            self.catch_up = CatchUpBuffer()
+
+            # Blob the recording is streamed to while the session is live
+            self.session_writer = SessionBlobWriter(
+                get_session_blob_name(
+                    self.org_id, self.channel_group_name, datetime.utcnow()
                 )
+            )
+            self.checkpoint_task = None
+
+            # Sequence number of the last event received from the widget
+            self.last_seq = 0
+
+            # Duration, event counts and pages of the recording so far
+            self.metadata = SessionMetadata()
+
+            if self.is_recording:
+                # Not while the previous connection or the reaper writes the
+                # writer state of the session
+                async with session_lock(
+                    self.redis, self.channel_group_name, settings.SESSION_LOCK_WAIT
+                ):
+                    # A reconnect within the grace window carries on with the
+                    # same Redis key, blob and UserSession
+                    await self.resume_session()
+
+                    # Get or create the session object asynchronously without blocking
+                    self.session_task = asyncio.create_task(
+                        self.get_or_create_session()
+                    )
+
+                    # Register the session so that the reaper can finalize it
+                    # if this process goes away before the disconnect
+                    await self.register_session()
+
+                # Periodically move the buffered events to azure storage
+                if settings.SESSION_CHECKPOINT_INTERVAL and not self.stream_mode:
+                    self.checkpoint_task = asyncio.create_task(
+                        self.checkpoint_periodically()
+                    )
             else:
                 self.session_task = None
 
+            # Tell the widget which events to resend
+            if query_string.get("resume", [None])[0] == "1":
+                await self.send(
+                    text_data=json.dumps({"type": "resume", "seq": self.last_seq})
+                )
+
+            # Close the connection once the widget stops answering pings
+            self.start_heartbeat(query_string)
+
             logger.info(
                 f"Connection established successfully -- {self.channel_group_name}"
             )
@@ -74,10 +171,10 @@ class EndUserConsumer(AsyncWebsocketConsumer):
             await self.close()
 
     async def disconnect(self, close_code):
-        from django_q.tasks import async_task
-
         try:
             logger.info(f"Starting disconnection process -- {self.channel_group_name}")
+            self.stop_heartbeat()
+
             # Leave the end user's private channel
             await self.channel_layer.group_discard(
                 self.channel_group_name, self.channel_name
@@ -93,152 +190,328 @@ class EndUserConsumer(AsyncWebsocketConsumer):
                     logger.error("Session creation task timed out during disconnect")
                     self.session = None
 
-            # Flush the local event buffer to Redis
-            if self.event_buffer:
-                await self.flush_event_buffer()
-
-            storage_url = None
+            # Stop checkpointing, the final tail is saved below
+            if self.checkpoint_task:
+                self.checkpoint_task.cancel()
 
-            # Check if the enduser_id is in SESSION_IGNORE_USER_IDS
-            if self.enduser_id not in self.SESSION_IGNORE_USER_IDS:
-                # Push the events to azure storage
-                storage_url = await asyncio.wait_for(
-                    self.save_events_to_azure(), timeout=20.0
+            # Keep the events held back by the rate limiter
+            if self.is_recording:
+                self.event_buffer.extend(self.rate_limiter.release())
+            if self.rate_limiter.shed:
+                logger.info(
+                    f"Shed events {dict(self.rate_limiter.shed)} -- {self.channel_group_name}"
                 )
+            # Nothing replays an unrecorded session once it ends
+            if not self.is_recording:
+                self.catch_up.take()
 
-                if self.session:
-                    try:
-                        if storage_url:
-                            # Add this storage_url to the session object
-                            self.session.storage_url = storage_url
-
-                        await asyncio.wait_for(self.session.asave(), timeout=15.0)
-
-                        # create an Event object for the session using django_q
-                        await sync_to_async(async_task)(
-                            "websocket.live_sessions.tasks.create_session_event",
-                            storage_url,
-                            self.session,
-                            self.enduser_id,
-                            self.total_duration,
-                        )
-
-                    except asyncio.TimeoutError:
-                        logger.error(
-                            "Saving session storage_url or initial_events timed out during disconnect"
-                        )
+            # Flush the local event buffer to Redis, this also waits for a
+            # flush of the shared flusher that may still be in flight
+            await self.flush_event_buffer()
+            self.flusher.unregister(self)
+
+            if self.is_recording:
+                if settings.SESSION_RESUME_GRACE:
+                    # Give the widget a chance to reconnect before saving
+                    task = asyncio.create_task(self.finalize_after_grace())
+                    self.finalize_tasks.add(task)
+                    task.add_done_callback(self.finalize_tasks.discard)
+                else:
+                    await self.finalize_session()
             logger.info(f"Disconnection process completed -- {self.channel_group_name}")
         except Exception as e:
             logger.error(f"Error during disconnect: {e}")
 
-    async def receive(self, text_data):
+    async def finalize_after_grace(self):
+        await asyncio.sleep(settings.SESSION_RESUME_GRACE)
         try:
-            text_data_json = json.loads(text_data)
-            message = text_data_json["message"]
-
-            # Check if the enduser_id is in SESSION_IGNORE_USER_IDS
-            if self.enduser_id not in self.SESSION_IGNORE_USER_IDS:
-                # Add the event to the local buffer
-                self.event_buffer.append(json.dumps(message))
-
-                # If the buffer size exceeds a threshold, flush it to Redis
-                if len(self.event_buffer) >= 100:
-                    await self.flush_event_buffer()
-
-                # Schedule buffer flushing task if not already scheduled
-                if not self.buffer_flush_task:
-                    self.buffer_flush_task = asyncio.create_task(
-                        self.flush_buffer_periodically()
+            await self.finalize_session()
+        except Exception as e:
+            logger.error(f"Error during finalize_after_grace: {e}")
+
+    async def finalize_session(self):
+        # The reaper finalizes sessions under the same lock
+        async with session_lock(
+            self.redis, self.channel_group_name, settings.SESSION_LOCK_WAIT
+        ):
+            connection = await self.redis.hget(self.session_key, "connection")
+            # Saved, or queued for the finalizers, by the reaper meanwhile
+            if connection is None:
+                logger.info(f"Session already finalized -- {self.channel_group_name}")
+                return
+            # The widget reconnected meanwhile, the new connection saves it
+            if connection.decode() != self.channel_name:
+                logger.info(
+                    f"Session resumed, not finalizing -- {self.channel_group_name}"
+                )
+                return
+
+            await self.save_session()
+
+    async def save_session(self):
+        from django_q.tasks import async_task
+
+        if self.stream_mode:
+            # Saving the session is left to the finalizers
+            await enqueue_finalize(self.redis, self.channel_group_name)
+            return
+
+        # Push the events to azure storage
+        storage_url = await asyncio.wait_for(self.save_events_to_azure(), timeout=20.0)
+
+        if self.session:
+            try:
+                if storage_url:
+                    # Add this storage_url to the session object
+                    self.session.storage_url = storage_url
+
+                await asyncio.wait_for(self.session.asave(), timeout=15.0)
+                if self.metadata.event_count:
+                    await asyncio.wait_for(
+                        save_session_metadata(self.session, self.metadata),
+                        timeout=15.0,
                     )
 
-            # EndUser pushing an event to their private channel
+                # create an Event object for the session using django_q
+                await sync_to_async(async_task)(
+                    "websocket.live_sessions.tasks.create_session_event",
+                    storage_url,
+                    self.session,
+                    self.enduser_id,
+                    self.metadata.duration,
+                )
+
+            except asyncio.TimeoutError:
+                logger.error(
+                    "Saving session storage_url or initial_events timed out during disconnect"
+                )
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            self.touch()
+            if text_data is not None and self.is_pong(text_data):
+                return
+
+            if bytes_data is not None:
+                # Binary frames are decoded once here, and forwarded as they
+                # are received
+                try:
+                    stored_event = receive_binary_frame(bytes_data)
+                except ValueError as e:
+                    logger.error(f"Dropping an invalid binary frame: {e}")
+                    return
+            else:
+                # The event is kept as raw JSON text, the same string is stored
+                # and forwarded to the viewers without being decoded again
+                seq, stored_event = extract_sequenced_message(text_data)
+
+                # Resent by the widget after a reconnect, already received
+                if seq is not None:
+                    if seq <= self.last_seq:
+                        return
+                    self.last_seq = seq
+
+            # Past the allowed event rate only part of the events are kept
+            for stored_event in self.rate_limiter.admit(
+                stored_event, len(self.event_buffer)
+            ):
+                await self.handle_event(stored_event)
+        except Exception as e:
+            logger.error(f"Error during receive: {e}")
+
+    async def handle_event(self, stored_event):
+        # Sessions that are not recorded are only forwarded to the viewers,
+        # and past the maximum session length only the viewers get the events
+        if self.is_recording and not self.is_recording_full():
+            # Add the event to the local buffer, the flusher writes it to
+            # Redis on its next tick
+            self.event_buffer.append(stored_event)
+            self.metadata.add(stored_event)
+
+        # Viewers may join any live session, recorded or not. The catch-up
+        # buffer of a session nobody watches is only kept in memory, it is
+        # written when a viewer joins, see viewer_presence.
+        self.catch_up.add(stored_event)
+        if self.is_recording or self.viewer_count:
+            self.flusher.mark_dirty(self)
+
+        # EndUser pushing an event to their private channel, only while
+        # a client is watching the session
+        if self.viewer_count:
             await self.channel_layer.group_send(
                 self.channel_group_name,
                 {
                     "type": "session_message",
-                    "message": message,
                     "sender_channel_name": self.channel_name,
+                    **to_session_message(stored_event),
                 },
             )
-        except Exception as e:
-            logger.error(f"Error during receive: {e}")
+
+    def is_recording_full(self):
+        if self.policy.is_too_long(self.metadata.duration):
+            return True
+
+        # The stream of a session is not capped, the recording stops instead
+        if (
+            self.stream_mode
+            and self.metadata.event_count >= settings.SESSION_STREAM_MAXLEN
+        ):
+            if not self.rate_limiter.shed["stream_full"]:
+                logger.error(
+                    f"Session stream full, no longer recording -- {self.channel_group_name}"
+                )
+            self.rate_limiter.shed["stream_full"] += 1
+            return True
+        return False
 
     async def flush_event_buffer(self):
-        if self.event_buffer:
-            await self.redis.rpush(self.redis_key, *self.event_buffer)
-            self.event_buffer = []
+        await self.flusher.flush_consumer(self)
 
-    async def flush_buffer_periodically(self):
-        try:
-            while True:
-                await asyncio.sleep(1)
+    async def checkpoint_periodically(self):
+        while True:
+            await asyncio.sleep(settings.SESSION_CHECKPOINT_INTERVAL)
+            try:
                 await self.flush_event_buffer()
-        except asyncio.CancelledError:
-            await self.flush_event_buffer()
+                await self.checkpoint_events()
+            except Exception as e:
+                logger.error(f"Error during checkpoint: {e}")
+
+    async def checkpoint_events(self):
+        # Skipped while the session is locked, the next one catches up
+        token = await acquire_session_lock(self.redis, self.channel_group_name)
+        if token is None:
+            return
+        try:
+            await self.write_checkpoint()
+        finally:
+            await release_session_lock(self.redis, self.channel_group_name, token)
+
+    async def write_checkpoint(self):
+        """
+        Moves the events in Redis to the blob, with the lock of the session.
+        """
+        # The blob belongs to the new connection of a resumed session
+        if await self.is_superseded():
+            return
+
+        # The writer state lets the reaper continue the same blob if the
+        # process dies
+        await checkpoint_session(
+            self.redis,
+            self.redis_key,
+            self.session_writer,
+            self.session_key,
+            connection=self.channel_name,
+        )
+
+    async def register_session(self):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(
+            self.session_key,
+            mapping={
+                "org_id": str(self.org_id),
+                "enduser_id": str(self.enduser_id),
+                "session_id": str(self.session_id),
+                "blob_name": self.session_writer.blob_name,
+                "writer": json.dumps(self.session_writer.get_state()),
+                "seq": self.last_seq,
+                "metadata": json.dumps(self.metadata.get_state()),
+                "connection": self.channel_name,
+            },
+        )
+        pipe.zadd(LIVE_SESSIONS_KEY, {self.channel_group_name: time.time()})
+        await pipe.execute()
+        self.flusher.register(self)
+
+    async def should_record(self, query_string):
+        email = None
+        if self.policy.needs_email:
+            email = await fetch_enduser_email(self.enduser_id)
+        return self.policy.should_record(
+            self.enduser_id,
+            self.session_id,
+            email=email,
+            url=query_string.get("url", [None])[0],
+        )
+
+    async def resume_session(self):
+        meta = await self.redis.hgetall(self.session_key)
+        # Sessions handed over to the finalizers are not resumed
+        if b"connection" not in meta:
+            return
+
+        meta = {key.decode(): value.decode() for key, value in meta.items()}
+        self.session_writer = get_session_writer(meta, self.channel_group_name)
+        self.last_seq = int(meta.get("seq", 0))
+        self.metadata = SessionMetadata(json.loads(meta.get("metadata", "{}")))
+        logger.info(f"Resuming the session -- {self.channel_group_name}")
+
+    async def get_or_create_session(self):
+        from user.models import UserSession
+
+        session, _ = await UserSession.objects.aget_or_create(
+            session_id=self.session_id,
+            defaults={"user_id": self.enduser_id},
+        )
+        return session
+
+    async def is_superseded(self):
+        connection = await self.redis.hget(self.session_key, "connection")
+        return connection is not None and connection.decode() != self.channel_name
+
+    async def unregister_session(self):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.delete(self.session_key)
+        pipe.zrem(LIVE_SESSIONS_KEY, self.channel_group_name)
+        await pipe.execute()
 
     async def session_message(self, event):
         try:
-            message = event["message"]
             sender_channel_name = event["sender_channel_name"]
 
             # Send message to WebSocket only if it is not the sender
             if self.channel_name != sender_channel_name:
-                await self.send(text_data=json.dumps({"message": message}))
+                await self.send(**outbound_frame(event, self.subprotocol))
         except Exception as e:
             logger.error(f"Error during session_message: {e}")
 
-    async def save_events_to_azure(self):
-        try:
-            connection_string = settings.AZURE_STORAGE_CONNECTION_STRING
-            container_name = settings.AZURE_STORAGE_CONTAINER_NAME
-            prefix = settings.AZURE_STORAGE_SESSIONS_PREFIX
-            blob_name = f"{prefix}/{self.org_id}/{self.channel_group_name}/{datetime.utcnow().isoformat()}.json"
+    async def viewer_presence(self, event):
+        self.viewer_count = event["viewer_count"]
 
-            blob_service_client = BlobServiceClient.from_connection_string(
-                connection_string
-            )
-            blob_client = blob_service_client.get_blob_client(
-                container=container_name, blob=blob_name
+        viewer_channel_name = event.get("viewer_channel_name")
+        if viewer_channel_name:
+            # Every event received so far is in the catch-up list once
+            # flushed, the viewer gets the later ones live
+            try:
+                await self.flush_event_buffer()
+                catch_up_length = self.catch_up.length
+            except Exception as e:
+                logger.error(f"Error during flushing for a viewer: {e}")
+                catch_up_length = None
+            await self.channel_layer.send(
+                viewer_channel_name,
+                {"type": "catch_up_ready", "catch_up_length": catch_up_length},
             )
 
-            # Retrieve events from Redis in batches
-            events = []
-            while True:
-                batch = await self.redis.lrange(self.redis_key, 0, 99)
-                if not batch:
-                    break
-                events.extend([json.loads(event) for event in batch])
-                await self.redis.ltrim(self.redis_key, len(batch), -1)
-
-            if not events:
-                return None
-            # Convert the events list to JSON and upload
-            events_json = json.dumps(events)
-            try:
-                await blob_client.upload_blob(events_json)
-            finally:
-                # Ensure that the client is properly closed
-                await blob_service_client.close()
-                await blob_client.close()
+    async def save_events_to_azure(self):
+        try:
+            # Only the events since the last checkpoint are left in Redis,
+            # finalize_session holds the lock of the session
+            await self.write_checkpoint()
 
-            # Calculate total duration from events
-            try:
-                self.total_duration = int(events[-1]["timestamp"]) - int(
-                    events[0]["timestamp"]
-                )
-            except Exception as e:
-                logger.error(f"Error during calculating total_duration: {e}")
+            # The session is saved, the reaper has nothing left to do with it
+            await self.unregister_session()
 
-            # Return the blob URL
-            return blob_client.url
+            # Return the blob URL, None if the session has no events
+            return self.session_writer.url
         except Exception as e:
             logger.error(f"Error during save_events_to_azure: {e}")
             return None
 
 
-class ClientConsumer(AsyncWebsocketConsumer):
+class ClientConsumer(HeartbeatMixin, AsyncWebsocketConsumer):
     async def connect(self):
-        from pusher_channel_app.utils import publish_event_to_user
+        from pusher_channel_app.utils import apublish_event_to_user
         from infra_utils.utils import encode_base64
 
         query_string = parse_qs(self.scope["query_string"].decode())
@@ -251,18 +524,44 @@ class ClientConsumer(AsyncWebsocketConsumer):
         self.channel_group_name = (
             f"{self.channel_type}_{self.org_id}_{self.enduser_id}_{self.session_id}"
         )
+        self.viewers_key = get_viewers_key(self.channel_group_name)
+        self.catch_up_key = get_catch_up_key(self.channel_group_name)
+
+        self.redis = await RedisPool.get_instance()
+
+        # Live events are held back until the viewer has caught up
+        self.catching_up = True
+        self.held_back_messages = []
+        self.catch_up_timeout_task = None
 
         # Join the end user's private channel
         await self.channel_layer.group_add(self.channel_group_name, self.channel_name)
 
-        await self.accept()
+        self.subprotocol = select_subprotocol(self.scope)
+        await self.accept(subprotocol=self.subprotocol)
+
+        # Let the enduser know that the session is being watched, they answer
+        # with catch_up_ready once the events so far are in Redis
+        catch_up_available = False
+        try:
+            await self.redis.sadd(self.viewers_key, self.channel_name)
+            await self.redis.expire(self.viewers_key, settings.SESSION_VIEWERS_TTL)
+            catch_up_available = bool(await self.redis.exists(self.catch_up_key))
+            await self.send_viewer_presence(catch_up=True)
+        except Exception as e:
+            logger.error(f"Error during registering the viewer: {e}")
+
+        # Catch up anyway if the enduser does not answer, e.g. in between two
+        # of their connections
+        self.catch_up_timeout_task = asyncio.create_task(self.catch_up_timeout())
 
         # send a pusher notification to the enduser
         pusher_data_obj = {
             "source_event_type": "live_session_connected",
+            "catch_up_available": catch_up_available,
         }
         try:
-            await sync_to_async(publish_event_to_user)(
+            await apublish_event_to_user(
                 self.org_id,
                 "private",
                 f"{encode_base64(self.enduser_id)}",
@@ -273,14 +572,98 @@ class ClientConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error during sending a pusher event: {e}")
 
+        # Close the connection once the viewer stops answering pings
+        self.start_heartbeat(query_string)
+
     async def disconnect(self, close_code):
+        self.stop_heartbeat()
+
         # Leave the end user's private channel
         await self.channel_layer.group_discard(
             self.channel_group_name, self.channel_name
         )
 
+        if self.catch_up_timeout_task:
+            self.catch_up_timeout_task.cancel()
+
+        try:
+            await self.redis.srem(self.viewers_key, self.channel_name)
+            await self.send_viewer_presence()
+        except Exception as e:
+            logger.error(f"Error during unregistering the viewer: {e}")
+
+    async def receive(self, text_data=None, bytes_data=None):
+        # Viewers only send pongs
+        self.touch()
+
+    async def send_viewer_presence(self, catch_up=False):
+        viewer_count = await self.redis.scard(self.viewers_key)
+        event = {
+            "type": "viewer_presence",
+            "viewer_count": viewer_count,
+        }
+        if catch_up:
+            event["viewer_channel_name"] = self.channel_name
+        await self.channel_layer.group_send(self.channel_group_name, event)
+
+    async def viewer_presence(self, event):
+        # Only meant for the enduser
+        pass
+
+    async def catch_up_timeout(self):
+        await asyncio.sleep(settings.SESSION_CATCH_UP_TIMEOUT)
+        # Goes through the channel layer so that it is handled in order with
+        # the session messages
+        await self.channel_layer.send(
+            self.channel_name, {"type": "catch_up_ready", "catch_up_length": None}
+        )
+
+    async def catch_up_ready(self, event):
+        if not self.catching_up:
+            return
+
+        self.catching_up = False
+        if self.catch_up_timeout_task:
+            self.catch_up_timeout_task.cancel()
+            self.catch_up_timeout_task = None
+
+        catch_up_length = event["catch_up_length"]
+        try:
+            # Only the events up to the answer of the enduser, the later ones
+            # are received live. Without an answer the whole list is used.
+            if catch_up_length == 0:
+                stored_events = []
+            else:
+                end = -1 if catch_up_length is None else catch_up_length - 1
+                stored_events = await self.redis.lrange(self.catch_up_key, 0, end)
+
+            for stored_event in stored_events:
+                await self.send(
+                    **outbound_frame(to_session_message(stored_event), self.subprotocol)
+                )
+        except Exception as e:
+            logger.error(f"Error during catching up: {e}")
+            stored_events = []
+
+        held_back_messages = self.held_back_messages
+        self.held_back_messages = []
+
+        # The enduser answered after adding every event held back so far to
+        # the catch-up list
+        if catch_up_length is not None and stored_events:
+            return
+
+        # Without an answer the list was read at some point of the held back
+        # events, only the ones it does not hold are sent
+        caught_up = set(stored_events)
+        for event in held_back_messages:
+            if to_stored_event(event) not in caught_up:
+                await self.session_message(event)
+
     async def session_message(self, event):
-        message = event["message"]
+        if self.catching_up:
+            self.held_back_messages.append(event)
+            return
 
         # Send message to WebSocket
-        await self.send(text_data=json.dumps({"message": message}))
+        await self.send(**outbound_frame(event, self.subprotocol))
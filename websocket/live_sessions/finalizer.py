@@ -0,0 +1,152 @@
+from django.conf import settings
+from redis.exceptions import ResponseError
+from websocket.live_sessions.keys import (
+    FINALIZE_STREAM_KEY,
+    get_session_key,
+    get_stream_key,
+)
+from websocket.live_sessions.reaper import (
+    get_session_writer,
+    load_session_meta,
+    save_session_recording,
+)
+from websocket.live_sessions.storage import checkpoint_stream
+from websocket.live_sessions.streams import FINALIZE_SESSION_FIELD, FINALIZER_GROUP
+
+import asyncio
+import logging
+
+
+logger = logging.getLogger("django")
+
+
+async def finalize_stream_session(redis, channel_group_name):
+    """
+    Saves a session of the stream storage mode to azure storage, links the
+    blob to its UserSession and creates the session event.
+
+    The stream is only deleted once the session is saved, and the writer
+    state of the session hash is never updated in this mode, so a failed
+    attempt starts over from the first event, into the same blob, when the
+    job is retried.
+    """
+    meta = await load_session_meta(redis, channel_group_name)
+    if meta is None:
+        logger.error(f"Unable to parse the session {channel_group_name}")
+        return None
+
+    writer = get_session_writer(meta, channel_group_name)
+    await checkpoint_stream(redis, get_stream_key(channel_group_name), writer)
+
+    if writer.url:
+        await save_session_recording(meta, writer)
+
+    await redis.delete(
+        get_stream_key(channel_group_name), get_session_key(channel_group_name)
+    )
+    return writer.url
+
+
+class SessionFinalizer:
+    """
+    Saves the sessions queued on FINALIZE_STREAM_KEY.
+
+    Any number of finalizers, in any number of processes, read the queue
+    through the same consumer group so that each job goes to one of them.
+    A job is acknowledged once its session is saved, the jobs of a failed or
+    dead finalizer stay pending and are claimed again by any finalizer after
+    SESSION_FINALIZER_CLAIM_IDLE seconds.
+    """
+
+    def __init__(self, redis, name):
+        self.redis = redis
+        self.name = name
+        self.batch_size = settings.SESSION_FINALIZER_BATCH_SIZE
+        self.claim_idle = settings.SESSION_FINALIZER_CLAIM_IDLE * 1000
+        self.max_attempts = settings.SESSION_FINALIZER_MAX_ATTEMPTS
+        self.block = 5000
+
+    async def ensure_group(self):
+        try:
+            await self.redis.xgroup_create(
+                FINALIZE_STREAM_KEY, FINALIZER_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            # The group was created by another finalizer
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self):
+        await self.ensure_group()
+        logger.info(f"Session finalizer {self.name} started")
+        while True:
+            try:
+                await self.claim_stale_jobs()
+                await self.read_new_jobs()
+            except Exception as e:
+                logger.error(f"Error during finalizing sessions: {e}")
+                await asyncio.sleep(1)
+
+    async def read_new_jobs(self):
+        response = await self.redis.xreadgroup(
+            FINALIZER_GROUP,
+            self.name,
+            {FINALIZE_STREAM_KEY: ">"},
+            count=self.batch_size,
+            block=self.block,
+        )
+        for _, jobs in response or []:
+            for job_id, fields in jobs:
+                await self.process(job_id, fields)
+
+    async def claim_stale_jobs(self):
+        response = await self.redis.xautoclaim(
+            FINALIZE_STREAM_KEY,
+            FINALIZER_GROUP,
+            self.name,
+            min_idle_time=self.claim_idle,
+            start_id="0-0",
+            count=self.batch_size,
+        )
+        for job_id, fields in response[1]:
+            if not fields:
+                continue
+
+            pending = await self.redis.xpending_range(
+                FINALIZE_STREAM_KEY,
+                FINALIZER_GROUP,
+                min=job_id,
+                max=job_id,
+                count=1,
+            )
+            if pending and pending[0]["times_delivered"] > self.max_attempts:
+                await self.give_up(job_id, fields)
+                continue
+
+            await self.process(job_id, fields)
+
+    async def process(self, job_id, fields):
+        channel_group_name = fields[FINALIZE_SESSION_FIELD.encode()].decode()
+        try:
+            await finalize_stream_session(self.redis, channel_group_name)
+        except Exception as e:
+            # Left pending, the job is retried once it is claimed again
+            logger.error(f"Error during finalizing {channel_group_name}: {e}")
+            return
+
+        await self.ack(job_id)
+
+    async def give_up(self, job_id, fields):
+        channel_group_name = fields[FINALIZE_SESSION_FIELD.encode()].decode()
+        logger.error(f"Giving up on finalizing {channel_group_name}")
+        # Dropped, nothing adopts or finalizes the session again
+        await self.redis.delete(
+            get_stream_key(channel_group_name), get_session_key(channel_group_name)
+        )
+        await self.ack(job_id)
+
+    async def ack(self, job_id):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(FINALIZE_STREAM_KEY, FINALIZER_GROUP, job_id)
+        pipe.xdel(FINALIZE_STREAM_KEY, job_id)
+        await pipe.execute()
@@ -0,0 +1,196 @@
+from django.conf import settings
+from websocket.utils import RedisPool
+from websocket.live_sessions.catch_up import queue_catch_up_write
+from websocket.live_sessions.keys import LIVE_SESSIONS_KEY
+from websocket.live_sessions.streams import append_events
+
+import asyncio
+import json
+import logging
+import time
+
+
+logger = logging.getLogger("django")
+
+
+def writes_catch_up(consumer):
+    """
+    Tells whether the catch-up buffer of `consumer` has to be written, the
+    one of an unrecorded session stays in memory while nobody watches it.
+    """
+    return consumer.catch_up.dirty and bool(
+        consumer.is_recording or consumer.viewer_count
+    )
+
+
+class EventBufferFlusher:
+    """
+    Flushes the local event buffers of every live consumer of the process.
+
+    Consumers append to their own `event_buffer` and `catch_up` buffer and
+    mark themselves dirty, a single task then writes all dirty buffers to
+    Redis in one pipelined round trip per tick instead of one timer and one
+    RPUSH per connection.
+
+    The same task keeps the last seen score of the registered sessions in
+    LIVE_SESSIONS_KEY fresh, so that the reaper only picks up sessions whose
+    process is gone.
+    """
+
+    _instance = None
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.interval = settings.SESSION_FLUSH_INTERVAL
+        self.max_batch_size = settings.SESSION_FLUSH_MAX_BATCH_SIZE
+        self.heartbeat_interval = settings.SESSION_HEARTBEAT_INTERVAL
+        self.consumers = set()
+        # dict keeps the consumers in the order they became dirty
+        self.dirty = {}
+        self.lock = asyncio.Lock()
+        self.task = None
+        self.last_heartbeat = 0
+
+    @classmethod
+    async def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls(await RedisPool.get_instance())
+        return cls._instance
+
+    def register(self, consumer):
+        self.consumers.add(consumer)
+        self.start()
+
+    def unregister(self, consumer):
+        self.consumers.discard(consumer)
+
+    def mark_dirty(self, consumer):
+        self.dirty[consumer] = None
+        self.start()
+
+    def start(self):
+        # Started lazily so that it runs on the event loop of the consumers
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error during flushing event buffers: {e}")
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                logger.error(f"Error during live sessions heartbeat: {e}")
+
+    async def heartbeat(self):
+        now = time.time()
+        if not self.consumers or now - self.last_heartbeat < self.heartbeat_interval:
+            return
+        await self.redis.zadd(
+            LIVE_SESSIONS_KEY,
+            {consumer.channel_group_name: now for consumer in self.consumers},
+        )
+        self.last_heartbeat = now
+
+    async def flush(self):
+        # Only the consumers dirty when the tick starts, the ones marked dirty
+        # meanwhile wait for the next tick, so that a tick always ends
+        dirty, self.dirty = self.dirty, {}
+        try:
+            while dirty:
+                # Released between batches to let flush_consumer in
+                async with self.lock:
+                    await self.flush_batch(dirty)
+        except Exception:
+            for consumer in dirty:
+                self.dirty[consumer] = None
+            raise
+
+    async def flush_batch(self, dirty):
+        batch = []
+        batch_size = 0
+        while dirty and batch_size < self.max_batch_size:
+            consumer = next(iter(dirty))
+            del dirty[consumer]
+            if not consumer.event_buffer and not writes_catch_up(consumer):
+                continue
+            taken = self.take_buffers(consumer)
+            batch.append((consumer, taken))
+            batch_size += len(taken[0]) + len(taken[1][1])
+
+        if not batch:
+            return
+
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for consumer, taken in batch:
+            self.queue_write(pipe, consumer, taken)
+        recorded = {
+            consumer.channel_group_name: now
+            for consumer, (events, _, _) in batch
+            if events
+        }
+        if recorded:
+            pipe.zadd(LIVE_SESSIONS_KEY, recorded)
+        try:
+            await pipe.execute()
+        except Exception:
+            # Put the events back in front of anything buffered meanwhile
+            for consumer, taken in batch:
+                self.put_back(consumer, taken)
+                self.dirty[consumer] = None
+            raise
+
+    async def flush_consumer(self, consumer):
+        """
+        Writes the buffers of a single consumer right away, after any flush
+        that is already in flight so that the events stay in order.
+        """
+        async with self.lock:
+            self.dirty.pop(consumer, None)
+            if consumer.event_buffer or writes_catch_up(consumer):
+                taken = self.take_buffers(consumer)
+                pipe = self.redis.pipeline(transaction=False)
+                self.queue_write(pipe, consumer, taken)
+                try:
+                    await pipe.execute()
+                except Exception:
+                    self.put_back(consumer, taken)
+                    raise
+
+    def take_buffers(self, consumer):
+        progress = None
+        if consumer.event_buffer:
+            progress = {
+                "seq": consumer.last_seq,
+                "metadata": json.dumps(consumer.metadata.get_state()),
+            }
+        catch_up = (
+            consumer.catch_up.take() if writes_catch_up(consumer) else (False, [])
+        )
+        taken = (consumer.event_buffer, catch_up, progress)
+        consumer.event_buffer = []
+        return taken
+
+    def queue_write(self, pipe, consumer, taken):
+        events, catch_up, progress = taken
+        if events:
+            # Along with where a resumed connection picks up, and what the
+            # session metadata is once the events are stored
+            append_events(
+                pipe,
+                consumer.session_key,
+                consumer.redis_key,
+                consumer.channel_name,
+                events,
+                progress,
+            )
+        queue_catch_up_write(pipe, consumer.catch_up_key, catch_up)
+
+    def put_back(self, consumer, taken):
+        events, catch_up, _ = taken
+        consumer.event_buffer[:0] = events
+        consumer.catch_up.put_back(catch_up)
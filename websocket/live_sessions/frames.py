@@ -0,0 +1,196 @@
+from django.conf import settings
+
+import json
+import msgpack
+import zlib
+
+
+MESSAGE_PREFIX = '{"message":'
+SEQ_PREFIX = '{"seq":'
+SEQ_SEPARATOR = ',"message":'
+
+# Opt-in binary protocol, negotiated through the websocket subprotocol header.
+# Every binary frame carries a single rrweb event encoded with msgpack, behind
+# a one byte header telling whether the msgpack payload is deflated.
+MSGPACK_SUBPROTOCOL = "pingbase.msgpack"
+MSGPACK = 0
+MSGPACK_DEFLATE = 1
+
+json_decoder = json.JSONDecoder()
+
+
+def is_single_value(raw):
+    """
+    Tells whether `raw` is exactly one JSON value, with nothing around it.
+    """
+    try:
+        _, end = json_decoder.raw_decode(raw)
+    except ValueError:
+        return False
+    return end == len(raw)
+
+
+def extract_raw_message(text_data):
+    """
+    Returns the `message` of an inbound frame as raw JSON text.
+
+    The widget sends frames shaped exactly like {"message": <rrweb event>},
+    for those the event is sliced out of the frame and only checked to be a
+    single JSON value, it is not encoded again. Any other shape falls back to
+    decoding the frame and encoding the message, invalid frames raise.
+    """
+    if text_data.startswith(MESSAGE_PREFIX) and text_data.endswith("}"):
+        raw_message = text_data[len(MESSAGE_PREFIX) : -1].strip()
+        if is_single_value(raw_message):
+            return raw_message
+
+    return json.dumps(json.loads(text_data)["message"])
+
+
+def extract_sequenced_message(text_data):
+    """
+    Returns the sequence number and the raw `message` of an inbound frame.
+
+    Widgets able to resume a session send {"seq": <n>, "message": <event>},
+    sliced and checked like in `extract_raw_message`. The sequence number is
+    None for frames that do not carry one.
+    """
+    if text_data.startswith(SEQ_PREFIX) and text_data.endswith("}"):
+        separator = text_data.find(SEQ_SEPARATOR)
+        if separator != -1:
+            seq = text_data[len(SEQ_PREFIX) : separator]
+            raw_message = text_data[separator + len(SEQ_SEPARATOR) : -1].strip()
+            if seq.strip().isdigit() and is_single_value(raw_message):
+                return int(seq), raw_message
+
+    if text_data.startswith(MESSAGE_PREFIX):
+        return None, extract_raw_message(text_data)
+
+    frame = json.loads(text_data)
+    return frame.get("seq"), json.dumps(frame["message"])
+
+
+def build_frame(raw_message):
+    """
+    Wraps a raw JSON message into an outbound frame without re-encoding it.
+    """
+    return f"{MESSAGE_PREFIX}{raw_message}}}"
+
+
+def select_subprotocol(scope):
+    if MSGPACK_SUBPROTOCOL in scope.get("subprotocols", []):
+        return MSGPACK_SUBPROTOCOL
+    return None
+
+
+def is_binary_frame(bytes_data):
+    return len(bytes_data) > 1 and bytes_data[0] in (MSGPACK, MSGPACK_DEFLATE)
+
+
+def encode_binary_frame(message, compress=False):
+    payload = msgpack.packb(message, use_bin_type=True)
+    if compress:
+        return bytes([MSGPACK_DEFLATE]) + zlib.compress(payload)
+    return bytes([MSGPACK]) + payload
+
+
+def decode_binary_frame(bytes_data):
+    if isinstance(bytes_data, BinaryFrame):
+        return bytes_data.event
+
+    payload = bytes_data[1:]
+    if bytes_data[0] == MSGPACK_DEFLATE:
+        # Frames come from the public widget socket, a few bytes must not
+        # inflate to gigabytes
+        decompressor = zlib.decompressobj()
+        payload = decompressor.decompress(payload, settings.SESSION_MAX_FRAME_SIZE)
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise ValueError("Binary frame too large or truncated")
+    # Recordings are written as JSON, bin and ext values have no JSON form
+    # and are refused here rather than when the recording is written
+    try:
+        return msgpack.unpackb(payload, raw=False, max_bin_len=0, max_ext_len=0)
+    except ValueError as e:
+        raise ValueError(f"Binary frame is not a JSON event: {e}")
+
+
+class BinaryFrame(bytes):
+    """
+    A binary frame as received, along with the event it decodes to.
+
+    Frames are decoded once on receipt, the metadata, the catch-up buffer and
+    the rate limiter read the event from here. The frame itself is what is
+    buffered in Redis and forwarded to the viewers speaking the binary
+    protocol, the storage writer converts it to JSON, see `to_json_event`.
+    """
+
+    event = None
+
+
+def receive_binary_frame(bytes_data):
+    """
+    Decodes an inbound binary frame, raises ValueError for invalid ones.
+    """
+    if not is_binary_frame(bytes_data):
+        raise ValueError("Not a binary frame")
+    try:
+        event = decode_binary_frame(bytes_data)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Invalid binary frame: {e}")
+
+    frame = BinaryFrame(bytes_data)
+    frame.event = event
+    return frame
+
+
+def to_json_event(stored_event):
+    """
+    Returns a stored event as JSON bytes, events that came in as binary
+    frames are converted from their decoded event.
+    """
+    if isinstance(stored_event, str):
+        return stored_event.encode()
+    if is_binary_frame(stored_event):
+        return json.dumps(decode_binary_frame(stored_event)).encode()
+    return stored_event
+
+
+def to_session_message(stored_event):
+    """
+    Returns the session_message fields forwarding a stored event, as it was
+    received or as read back from Redis.
+    """
+    if isinstance(stored_event, bytes):
+        if is_binary_frame(stored_event):
+            return {"binary_message": stored_event}
+        stored_event = stored_event.decode()
+    return {"raw_message": stored_event}
+
+
+def to_stored_event(event):
+    """
+    Returns the stored event a session_message forwards, as read back from
+    Redis.
+    """
+    if "binary_message" in event:
+        return bytes(event["binary_message"])
+    return event["raw_message"].encode()
+
+
+def outbound_frame(event, binary):
+    """
+    Returns the send() arguments for a session_message in the protocol of
+    the receiving websocket, converting only when the sender spoke the other.
+    """
+    if "binary_message" in event:
+        bytes_data = event["binary_message"]
+        if binary:
+            return {"bytes_data": bytes_data}
+        return {"text_data": build_frame(json.dumps(decode_binary_frame(bytes_data)))}
+
+    raw_message = event["raw_message"]
+    if binary:
+        return {"bytes_data": encode_binary_frame(json.loads(raw_message))}
+    return {"text_data": build_frame(raw_message)}
@@ -0,0 +1,63 @@
+from django.conf import settings
+
+import asyncio
+import logging
+import time
+
+
+logger = logging.getLogger("django")
+
+PING_FRAME = '{"type":"ping"}'
+PONG_FRAME = '{"type":"pong"}'
+
+# Close code of the connections that stopped answering pings
+IDLE_CLOSE_CODE = 4408
+
+
+class HeartbeatMixin:
+    """
+    Application level ping/pong for websocket consumers.
+
+    Clients opt in with the heartbeat=1 query parameter, they are then sent
+    PING_FRAME every WEBSOCKET_PING_INTERVAL seconds and have to answer with
+    PONG_FRAME. Any frame counts as a sign of life, a connection silent for
+    WEBSOCKET_IDLE_TIMEOUT seconds is closed and goes through the normal
+    disconnect of the consumer.
+    """
+
+    heartbeat_task = None
+
+    def start_heartbeat(self, query_string):
+        self.last_seen = time.monotonic()
+        if (
+            query_string.get("heartbeat", [None])[0] == "1"
+            and settings.WEBSOCKET_IDLE_TIMEOUT
+        ):
+            self.heartbeat_task = asyncio.create_task(self.heartbeat())
+
+    def stop_heartbeat(self):
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+            self.heartbeat_task = None
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def is_pong(self, text_data):
+        return text_data == PONG_FRAME
+
+    async def heartbeat(self):
+        while True:
+            await asyncio.sleep(settings.WEBSOCKET_PING_INTERVAL)
+
+            if time.monotonic() - self.last_seen > settings.WEBSOCKET_IDLE_TIMEOUT:
+                logger.info(f"Closing an idle connection -- {self.channel_group_name}")
+                # The server answers with a websocket.disconnect once closed
+                self.heartbeat_task = None
+                await self.close(code=IDLE_CLOSE_CODE)
+                return
+
+            try:
+                await self.send(text_data=PING_FRAME)
+            except Exception as e:
+                logger.error(f"Error during sending a ping: {e}")
@@ -0,0 +1,33 @@
+# Redis keys of the live sessions, all per session keys are suffixed with the
+# channel group name of the session.
+
+# Sorted set of channel group name -> last time the session was seen alive
+LIVE_SESSIONS_KEY = "live_sessions"
+
+
+def get_events_key(channel_group_name):
+    return f"events_{channel_group_name}"
+
+
+def get_viewers_key(channel_group_name):
+    return f"viewers_{channel_group_name}"
+
+
+def get_session_key(channel_group_name):
+    return f"session_{channel_group_name}"
+
+
+def get_finalize_lock_key(channel_group_name):
+    return f"finalize_{channel_group_name}"
+
+
+def get_stream_key(channel_group_name):
+    return f"stream_{channel_group_name}"
+
+
+# Stream of the sessions waiting to be saved by the finalizers
+FINALIZE_STREAM_KEY = "session_finalize"
+
+
+def get_catch_up_key(channel_group_name):
+    return f"catch_up_{channel_group_name}"
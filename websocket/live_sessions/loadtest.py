@@ -0,0 +1,476 @@
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from contextlib import asynccontextmanager, contextmanager
+from django.test import override_settings
+from unittest import mock
+from websocket.live_sessions.benchmarks import generate_rrweb_events
+from websocket.live_sessions.flusher import EventBufferFlusher
+from websocket.live_sessions.keys import get_events_key, get_stream_key
+from websocket.live_sessions.locks import RELEASE_LOCK_SCRIPT
+from websocket.live_sessions.storage import CHECKPOINT_SCRIPT
+from websocket.live_sessions.streams import APPEND_EVENTS_SCRIPT, is_stream_mode
+from websocket.utils import RedisPool
+
+import asyncio
+import json
+import resource
+import time
+import uuid
+
+
+class InMemoryPipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self):
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.commands = []
+        return results
+
+
+class InMemoryRedis:
+    """
+    Stand-in for the redis.asyncio client with the commands the live sessions
+    use, it counts the commands it runs like Redis does.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.commands = 0
+
+    def _key(self, key):
+        return key.decode() if isinstance(key, bytes) else key
+
+    def _value(self, value):
+        return value if isinstance(value, bytes) else str(value).encode()
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+    async def rpush(self, key, *values):
+        self.commands += 1
+        items = self.data.setdefault(self._key(key), [])
+        items.extend(self._value(value) for value in values)
+        return len(items)
+
+    async def xadd(self, key, fields, maxlen=None, approximate=True):
+        self.commands += 1
+        items = self.data.setdefault(self._key(key), [])
+        items.append({self._value(k): self._value(v) for k, v in fields.items()})
+        if maxlen and len(items) > maxlen:
+            del items[: len(items) - maxlen]
+        return f"{len(items)}-0".encode()
+
+    async def eval(self, script, numkeys, *args):
+        self.commands += 1
+        # Python versions of the scripts the live sessions run
+        run = {
+            APPEND_EVENTS_SCRIPT: self._append_events,
+            CHECKPOINT_SCRIPT: self._checkpoint,
+            RELEASE_LOCK_SCRIPT: self._release_lock,
+        }[script]
+        return run(args[:numkeys], args[numkeys:])
+
+    def _is_superseded(self, session_key, connection):
+        current = self.data.get(self._key(session_key), {}).get(b"connection")
+        return current is not None and current != self._value(connection)
+
+    def _append_events(self, keys, argv):
+        session_key, redis_key = keys
+        connection, field, seq, metadata, *events = argv
+        if self._is_superseded(session_key, connection):
+            return 0
+        items = self.data.setdefault(self._key(redis_key), [])
+        if field:
+            items.extend({self._value(field): self._value(event)} for event in events)
+        else:
+            items.extend(self._value(event) for event in events)
+        fields = self.data.setdefault(self._key(session_key), {})
+        fields[b"seq"] = self._value(seq)
+        fields[b"metadata"] = self._value(metadata)
+        return 1
+
+    def _checkpoint(self, keys, argv):
+        session_key, redis_key = keys
+        connection, writer, start = argv
+        if connection and self._is_superseded(session_key, connection):
+            return 0
+        self.data.setdefault(self._key(session_key), {})[b"writer"] = self._value(
+            writer
+        )
+        items = self.data.get(self._key(redis_key), [])
+        self.data[self._key(redis_key)] = items[int(start) :]
+        return 1
+
+    def _release_lock(self, keys, argv):
+        (key,), (token,) = keys, argv
+        if self.data.get(self._key(key)) != self._value(token):
+            return 0
+        del self.data[self._key(key)]
+        return 1
+
+    async def llen(self, key):
+        self.commands += 1
+        return len(self.data.get(self._key(key), []))
+
+    xlen = llen
+
+    async def lrange(self, key, start, end):
+        self.commands += 1
+        items = self.data.get(self._key(key), [])
+        return items[start : None if end == -1 else end + 1]
+
+    async def ltrim(self, key, start, end):
+        self.commands += 1
+        items = self.data.get(self._key(key), [])
+        self.data[self._key(key)] = items[start : None if end == -1 else end + 1]
+
+    async def sadd(self, key, *members):
+        self.commands += 1
+        self.data.setdefault(self._key(key), set()).update(members)
+
+    async def srem(self, key, *members):
+        self.commands += 1
+        self.data.setdefault(self._key(key), set()).difference_update(members)
+
+    async def scard(self, key):
+        self.commands += 1
+        return len(self.data.get(self._key(key), ()))
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        self.commands += 1
+        fields = self.data.setdefault(self._key(key), {})
+        if field is not None:
+            fields[self._value(field)] = self._value(value)
+        for field, value in (mapping or {}).items():
+            fields[self._value(field)] = self._value(value)
+
+    async def hgetall(self, key):
+        self.commands += 1
+        return dict(self.data.get(self._key(key), {}))
+
+    async def hget(self, key, field):
+        self.commands += 1
+        return self.data.get(self._key(key), {}).get(self._value(field))
+
+    async def hdel(self, key, *fields):
+        self.commands += 1
+        values = self.data.get(self._key(key), {})
+        for field in fields:
+            values.pop(self._value(field), None)
+
+    async def zadd(self, key, mapping, nx=False):
+        self.commands += 1
+        scores = self.data.setdefault(self._key(key), {})
+        for member, score in mapping.items():
+            if not (nx and self._value(member) in scores):
+                scores[self._value(member)] = score
+
+    async def zrem(self, key, *members):
+        self.commands += 1
+        scores = self.data.get(self._key(key), {})
+        for member in members:
+            scores.pop(self._value(member), None)
+
+    async def set(self, key, value, nx=False, ex=None):
+        self.commands += 1
+        if nx and self._key(key) in self.data:
+            return None
+        self.data[self._key(key)] = self._value(value)
+        return True
+
+    async def exists(self, *keys):
+        self.commands += 1
+        return sum(self._key(key) in self.data for key in keys)
+
+    async def expire(self, key, seconds):
+        self.commands += 1
+
+    async def delete(self, *keys):
+        self.commands += 1
+        for key in keys:
+            self.data.pop(self._key(key), None)
+
+
+class InMemoryBlobClient:
+    def __init__(self, blob_name):
+        self.url = f"memory://{blob_name}"
+        self.blocks = {}
+
+    async def stage_block(self, block_id, data, **kwargs):
+        self.blocks[block_id] = data
+
+    async def commit_block_list(self, block_list, **kwargs):
+        pass
+
+    async def upload_blob(self, data, **kwargs):
+        pass
+
+
+class InMemoryContainerClient:
+    def __init__(self):
+        self.blobs = {}
+
+    def get_blob_client(self, blob_name):
+        if blob_name not in self.blobs:
+            self.blobs[blob_name] = InMemoryBlobClient(blob_name)
+        return self.blobs[blob_name]
+
+
+@asynccontextmanager
+async def in_memory_container_client():
+    yield InMemoryContainerClient()
+
+
+async def count_redis_commands(redis):
+    if isinstance(redis, InMemoryRedis):
+        return redis.commands
+    info = await redis.info("stats")
+    return info["total_commands_processed"]
+
+
+def get_rss():
+    """
+    Returns the peak resident set size of the process in MB.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class EventLoopLagMonitor:
+    """
+    Measures how late a task sleeping `interval` seconds wakes up.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.lags = []
+        self.task = None
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(time.perf_counter() - started - self.interval)
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    def stop(self):
+        self.task.cancel()
+
+
+def build_frame_templates(count, seed):
+    """
+    Returns frames of rrweb events, cut right before their closing braces so
+    that the send time is appended without encoding the events again.
+    """
+    templates = []
+    for event in generate_rrweb_events(count, seed=seed):
+        frame = json.dumps({"message": event}, separators=(",", ":"))
+        templates.append(frame[:-2] + ',"sent_at":')
+    return templates
+
+
+def get_sent_at(text):
+    start = text.rindex('"sent_at":') + len('"sent_at":')
+    return float(text[start : text.index("}", start)])
+
+
+class LoadTest:
+    """
+    Runs widgets streaming rrweb events to EndUserConsumer, with viewers on
+    ClientConsumer, against the ASGI app of this process.
+    """
+
+    def __init__(
+        self, widgets, viewers, rate, duration, redis=None, events_per_widget=2000
+    ):
+        self.widgets = widgets
+        self.viewers = viewers
+        self.rate = rate
+        self.duration = duration
+        self.redis = redis or InMemoryRedis()
+        self.events_per_widget = events_per_widget
+        self.org_id = str(uuid.uuid4())
+        self.sent = 0
+        self.latencies = []
+        self.delivered = 0
+
+    def get_path(self, channel, index):
+        return f"/ws/session/{channel}/loadtest/{index + 1}/loadtest{index}/?token={self.org_id}"
+
+    @contextmanager
+    def patched_environment(self):
+        from websocket.routing import websocket_urlpatterns
+
+        previous_redis = RedisPool._instance
+        previous_flusher = EventBufferFlusher._instance
+        RedisPool._instance = self.redis
+        EventBufferFlusher._instance = None
+        try:
+            with override_settings(
+                CHANNEL_LAYERS={
+                    "default": {
+                        "BACKEND": "channels.layers.InMemoryChannelLayer",
+                        "CONFIG": {"capacity": 100000},
+                    }
+                },
+                SESSION_CHECKPOINT_INTERVAL=0,
+                SESSION_RESUME_GRACE=0,
+            ), mock.patch(
+                "websocket.live_sessions.storage.session_container_client",
+                in_memory_container_client,
+            ), mock.patch(
+                # No database, the sessions are stored without a UserSession
+                "user.models.UserSession.objects.aget_or_create",
+                new=mock.AsyncMock(return_value=(None, False)),
+            ), mock.patch(
+                "pusher_channel_app.utils.apublish_event_to_user",
+                new=mock.AsyncMock(),
+            ):
+                yield URLRouter(websocket_urlpatterns)
+        finally:
+            RedisPool._instance = previous_redis
+            EventBufferFlusher._instance = previous_flusher
+
+    async def stream(self, communicator, templates):
+        interval = 1 / self.rate
+        next_send = time.perf_counter()
+        deadline = next_send + self.duration
+        index = 0
+        while next_send < deadline:
+            template = templates[index % len(templates)]
+            await communicator.send_input(
+                {
+                    "type": "websocket.receive",
+                    "text": f"{template}{time.perf_counter()}}}}}",
+                }
+            )
+            self.sent += 1
+            index += 1
+            next_send += interval
+            await asyncio.sleep(max(0, next_send - time.perf_counter()))
+
+    async def watch(self, communicator, connected_at):
+        while True:
+            message = await communicator.output_queue.get()
+            text = message.get("text")
+            if text is None:
+                continue
+            sent_at = get_sent_at(text)
+            # Events replayed by the catch-up were sent before the viewer
+            if sent_at >= connected_at:
+                self.latencies.append(time.perf_counter() - sent_at)
+                self.delivered += 1
+
+    async def count_stored_events(self):
+        stored = 0
+        for index in range(self.widgets):
+            channel_group_name = f"loadtest_{self.org_id}_{index + 1}_loadtest{index}"
+            if is_stream_mode():
+                stored += await self.redis.xlen(get_stream_key(channel_group_name))
+            else:
+                stored += await self.redis.llen(get_events_key(channel_group_name))
+        return stored
+
+    async def run(self):
+        with self.patched_environment() as application:
+            return await self._run(application)
+
+    async def _run(self, application):
+        widgets = []
+        for index in range(self.widgets):
+            communicator = WebsocketCommunicator(
+                application, self.get_path("enduser", index)
+            )
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise RuntimeError("A widget could not connect")
+            widgets.append(communicator)
+
+        viewers = []
+        watchers = []
+        for index in range(self.widgets):
+            for _ in range(self.viewers):
+                communicator = WebsocketCommunicator(
+                    application, self.get_path("client", index)
+                )
+                connected, _ = await communicator.connect()
+                if not connected:
+                    raise RuntimeError("A viewer could not connect")
+                viewers.append(communicator)
+                watchers.append(
+                    asyncio.create_task(self.watch(communicator, time.perf_counter()))
+                )
+
+        # Let the viewers catch up before measuring
+        await asyncio.sleep(0.5)
+
+        templates = [
+            build_frame_templates(self.events_per_widget, seed=index)
+            for index in range(self.widgets)
+        ]
+
+        monitor = EventLoopLagMonitor()
+        monitor.start()
+        commands_before = await count_redis_commands(self.redis)
+        started = time.perf_counter()
+
+        await asyncio.gather(
+            *(
+                self.stream(communicator, templates[index])
+                for index, communicator in enumerate(widgets)
+            )
+        )
+
+        # Wait for the consumers to handle everything that was sent
+        while any(not widget.input_queue.empty() for widget in widgets):
+            await asyncio.sleep(0.01)
+        # and for the last events to reach the viewers
+        await asyncio.sleep(0.2)
+        flusher = await EventBufferFlusher.get_instance()
+        await flusher.flush()
+        elapsed = time.perf_counter() - started
+        commands = await count_redis_commands(self.redis) - commands_before
+        monitor.stop()
+
+        stored = await self.count_stored_events()
+
+        for watcher in watchers:
+            watcher.cancel()
+        for communicator in viewers + widgets:
+            await communicator.disconnect()
+
+        return {
+            "widgets": self.widgets,
+            "viewers": self.widgets * self.viewers,
+            "sent": self.sent,
+            "stored": stored,
+            "elapsed": elapsed,
+            "throughput": stored / elapsed,
+            "delivered": self.delivered,
+            "fanout_p50": percentile(self.latencies, 0.5) * 1000,
+            "fanout_p99": percentile(self.latencies, 0.99) * 1000,
+            "redis_ops": commands / elapsed,
+            "loop_lag_p50": percentile(monitor.lags, 0.5) * 1000,
+            "loop_lag_p99": percentile(monitor.lags, 0.99) * 1000,
+            "loop_lag_max": max(monitor.lags, default=0) * 1000,
+            "rss": get_rss(),
+        }
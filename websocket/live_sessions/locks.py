@@ -0,0 +1,62 @@
+from contextlib import asynccontextmanager
+from django.conf import settings
+from websocket.live_sessions.keys import get_finalize_lock_key
+
+import asyncio
+import time
+import uuid
+
+
+# Seconds between two attempts at taking a lock held by someone else
+LOCK_RETRY_INTERVAL = 0.05
+
+# Deletes a lock only if it is still held with the token it was taken with,
+# a lock that expired meanwhile may have been taken by someone else
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+async def acquire_session_lock(redis, channel_group_name, wait=0):
+    """
+    Takes the lock of a session, waiting up to `wait` seconds for it, and
+    returns the token to release it with. None if someone else holds it.
+
+    The reaper holds it while finalizing a session, and connections while
+    they resume, checkpoint or save it, so that the writer state of the
+    session is only read and written by one of them at a time.
+    """
+    key = get_finalize_lock_key(channel_group_name)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not await redis.set(
+        key, token, nx=True, ex=settings.SESSION_REAPER_LOCK_TIMEOUT
+    ):
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(LOCK_RETRY_INTERVAL)
+    return token
+
+
+async def release_session_lock(redis, channel_group_name, token):
+    await redis.eval(
+        RELEASE_LOCK_SCRIPT, 1, get_finalize_lock_key(channel_group_name), token
+    )
+
+
+@asynccontextmanager
+async def session_lock(redis, channel_group_name, wait):
+    """
+    Holds the lock of a session, raises TimeoutError if it could not be
+    taken within `wait` seconds.
+    """
+    token = await acquire_session_lock(redis, channel_group_name, wait)
+    if token is None:
+        raise TimeoutError(f"The session {channel_group_name} is locked")
+    try:
+        yield
+    finally:
+        await release_session_lock(redis, channel_group_name, token)
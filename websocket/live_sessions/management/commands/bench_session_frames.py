@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from websocket.live_sessions.benchmarks import (
+    decode_and_reencode_frame,
+    generate_rrweb_events,
+    measure_frames_per_second,
+    passthrough_frame,
+)
+
+import json
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark of the rrweb frame ingest path, in frames per second on one core"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=5000)
+        parser.add_argument("--viewers", type=int, default=1)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        viewers = options["viewers"]
+        repeat = options["repeat"]
+
+        # Frames as sent by the widget
+        frames = [
+            json.dumps({"message": event}, separators=(",", ":"))
+            for event in generate_rrweb_events(options["events"])
+        ]
+        average_size = sum(len(frame) for frame in frames) / len(frames)
+        self.stdout.write(
+            f"{len(frames)} frames, {average_size:.0f} bytes on average, "
+            f"{viewers} viewer(s), best of {repeat}"
+        )
+
+        before = measure_frames_per_second(
+            decode_and_reencode_frame, frames, viewers, repeat
+        )
+        after = measure_frames_per_second(passthrough_frame, frames, viewers, repeat)
+
+        self.stdout.write(f"decode and re-encode: {before:>12,.0f} frames/s")
+        self.stdout.write(f"raw passthrough:      {after:>12,.0f} frames/s")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {after / before:.1f}x"))
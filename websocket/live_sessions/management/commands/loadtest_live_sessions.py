@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from redis.asyncio import Redis
+from websocket.live_sessions.loadtest import LoadTest
+
+import asyncio
+
+
+class Command(BaseCommand):
+    help = "Load test of the live session consumers, run in-process with an in-memory channel layer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--widgets", type=int, default=100)
+        parser.add_argument(
+            "--viewers", type=int, default=0, help="Viewers of every session"
+        )
+        parser.add_argument(
+            "--rate", type=float, default=20, help="Events per second of a widget"
+        )
+        parser.add_argument("--duration", type=float, default=10, help="Seconds")
+        parser.add_argument(
+            "--redis-url",
+            help="Local Redis to use instead of the in-memory stand-in, "
+            "it should not be shared with anything else",
+        )
+
+    def handle(self, *args, **options):
+        results = asyncio.run(self.run_load_test(options))
+
+        self.stdout.write(
+            f"{results['widgets']} widgets at {options['rate']:g} events/s, "
+            f"{results['viewers']} viewers, {results['elapsed']:.1f}s"
+        )
+        self.stdout.write(
+            f"events sent:       {results['sent']:>12,}\n"
+            f"events stored:     {results['stored']:>12,}\n"
+            f"throughput:        {results['throughput']:>12,.0f} events/s\n"
+            f"frames delivered:  {results['delivered']:>12,}\n"
+            f"fan-out latency:   {results['fanout_p50']:>9.2f} ms p50 "
+            f"{results['fanout_p99']:.2f} ms p99\n"
+            f"redis:             {results['redis_ops']:>12,.0f} ops/s\n"
+            f"event loop lag:    {results['loop_lag_p50']:>9.2f} ms p50 "
+            f"{results['loop_lag_p99']:.2f} ms p99 {results['loop_lag_max']:.2f} ms max\n"
+            f"peak rss:          {results['rss']:>9.1f} MB"
+        )
+
+    async def run_load_test(self, options):
+        redis = None
+        if options["redis_url"]:
+            redis = Redis.from_url(options["redis_url"])
+        try:
+            return await LoadTest(
+                options["widgets"],
+                options["viewers"],
+                options["rate"],
+                options["duration"],
+                redis=redis,
+            ).run()
+        finally:
+            if redis is not None:
+                await redis.aclose()
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from websocket.live_sessions.tasks import reap_orphaned_sessions
+
+
+REAPER_SCHEDULE_NAME = "Reap orphaned live sessions"
+
+
+class Command(BaseCommand):
+    help = "Finalizes the live sessions whose process went away without a disconnect"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="store_true",
+            help="Run the reaper every few minutes with django_q instead of once",
+        )
+        parser.add_argument("--minutes", type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options["schedule"]:
+            from django_q.models import Schedule
+            from django_q.tasks import schedule
+
+            Schedule.objects.filter(name=REAPER_SCHEDULE_NAME).delete()
+            schedule(
+                "websocket.live_sessions.tasks.reap_orphaned_sessions",
+                name=REAPER_SCHEDULE_NAME,
+                schedule_type=Schedule.MINUTES,
+                minutes=options["minutes"],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Scheduled the reaper every {options['minutes']} minutes"
+                )
+            )
+            return
+
+        reaped = reap_orphaned_sessions()
+        self.stdout.write(self.style.SUCCESS(f"Reaped {reaped} orphaned sessions"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from redis.asyncio import Redis
+from websocket.live_sessions.finalizer import SessionFinalizer
+from websocket.utils import get_redis_url
+
+import asyncio
+import os
+import socket
+
+
+class Command(BaseCommand):
+    help = "Runs finalizers saving the sessions of the stream storage mode"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+
+    def handle(self, *args, **options):
+        asyncio.run(self.run_finalizers(options["workers"]))
+
+    async def run_finalizers(self, workers):
+        redis = Redis.from_url(get_redis_url())
+        # Consumer names have to be unique across the processes of the group
+        prefix = f"{socket.gethostname()}-{os.getpid()}"
+        finalizers = [
+            SessionFinalizer(redis, f"{prefix}-{index}") for index in range(workers)
+        ]
+        try:
+            await asyncio.gather(*(finalizer.run() for finalizer in finalizers))
+        finally:
+            await redis.aclose()
@@ -0,0 +1,102 @@
+from websocket.live_sessions.rrweb import (
+    META,
+    decode_event,
+    get_event_kind,
+    get_event_time,
+)
+
+import logging
+
+
+logger = logging.getLogger("django")
+
+
+class SessionMetadata:
+    """
+    Running summary of a recording, updated as the events are buffered.
+
+    Apart from the meta events, which carry the URL of the page, the events
+    are not decoded: their type and timestamp are read from the raw frame.
+    The state is written to the session hash along with the events, so that
+    whoever finalizes the session saves the metadata of what was stored.
+    """
+
+    def __init__(self, state=None):
+        self.set_state(state or {})
+
+    def get_state(self):
+        return {
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "event_counts": dict(self.event_counts),
+            "byte_size": self.byte_size,
+            "urls": list(self.urls),
+        }
+
+    def set_state(self, state):
+        self.started_at = state.get("started_at")
+        self.ended_at = state.get("ended_at")
+        self.event_counts = dict(state.get("event_counts", {}))
+        self.byte_size = state.get("byte_size", 0)
+        self.urls = list(state.get("urls", []))
+
+    @property
+    def event_count(self):
+        return sum(self.event_counts.values())
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.ended_at is None:
+            return 0
+        return self.ended_at - self.started_at
+
+    def add(self, stored_event):
+        try:
+            event_type, _ = get_event_kind(stored_event)
+            timestamp = get_event_time(stored_event)
+        except Exception as e:
+            logger.error(f"Error while reading the event metadata: {e}")
+            return
+
+        # Keyed by strings, the counts go through JSON
+        key = str(event_type)
+        self.event_counts[key] = self.event_counts.get(key, 0) + 1
+        self.byte_size += len(
+            stored_event.encode() if isinstance(stored_event, str) else stored_event
+        )
+
+        if self.started_at is None or timestamp < self.started_at:
+            self.started_at = timestamp
+        if self.ended_at is None or timestamp > self.ended_at:
+            self.ended_at = timestamp
+
+        if event_type == META:
+            try:
+                href = decode_event(stored_event)["data"].get("href")
+            except Exception as e:
+                logger.error(f"Error while reading the page of a meta event: {e}")
+                return
+            # Reloads and single page apps emit the same URL again
+            if href and (not self.urls or self.urls[-1] != href):
+                self.urls.append(href)
+
+
+async def save_session_metadata(session, metadata):
+    """
+    Saves the metadata of a recording to the UserSessionMetadata of `session`.
+    """
+    from user.models import UserSessionMetadata
+
+    await UserSessionMetadata.objects.aupdate_or_create(
+        session=session,
+        defaults={
+            "started_at": metadata.started_at,
+            "ended_at": metadata.ended_at,
+            "duration": metadata.duration,
+            "event_count": metadata.event_count,
+            "event_counts": metadata.event_counts,
+            "byte_size": metadata.byte_size,
+            "page_count": len(set(metadata.urls)),
+            "urls": metadata.urls,
+        },
+    )
@@ -0,0 +1,135 @@
+from azure.storage.blob import BlobClient, BlobSasPermissions, generate_blob_sas
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from django.conf import settings
+from functools import partial
+from websocket.live_sessions.compression import (
+    IDENTITY,
+    accepts_encoding,
+    iter_decompressed,
+)
+
+import aiohttp
+import json
+
+
+MANIFEST_SUFFIX = "/manifest.json"
+
+# Bytes read at once from a recording streamed back to a client
+READ_SIZE = 64 * 1024
+
+
+def is_chunked_recording(storage_url):
+    return bool(storage_url) and storage_url.endswith(MANIFEST_SUFFIX)
+
+
+def get_blob_client(url):
+    return BlobClient.from_blob_url(
+        url,
+        credential={
+            "account_name": settings.AZURE_STORAGE_ACCOUNT_NAME,
+            "account_key": settings.AZURE_STORAGE_ACCOUNT_KEY,
+        },
+    )
+
+
+def load_manifest(storage_url):
+    """
+    Downloads the manifest of a chunked recording, see SessionBlobWriter.
+    """
+    with get_blob_client(storage_url) as blob_client:
+        return json.loads(blob_client.download_blob().readall())
+
+
+def get_blob_read_url(url):
+    """
+    Returns `url` signed for reading it for a few minutes.
+    """
+    blob_client = BlobClient.from_blob_url(url)
+    sas_token = generate_blob_sas(
+        account_name=settings.AZURE_STORAGE_ACCOUNT_NAME,
+        container_name=blob_client.container_name,
+        blob_name=blob_client.blob_name,
+        account_key=settings.AZURE_STORAGE_ACCOUNT_KEY,
+        permission=BlobSasPermissions(read=True),
+        expiry=datetime.utcnow() + timedelta(minutes=5),
+    )
+    return f"{url}?{sas_token}"
+
+
+async def close_response(session, response):
+    response.close()
+    await session.close()
+
+
+async def iter_response(session, response):
+    try:
+        async for chunk in response.content.iter_chunked(READ_SIZE):
+            yield chunk
+    finally:
+        await close_response(session, response)
+
+
+async def open_recording(url, accept_encoding):
+    """
+    Returns the content of a recording blob as an async iterable of bytes,
+    the encoding it is sent with: as stored to the clients that accept it,
+    decompressed for the others, and a coroutine function closing the
+    connection, for contents that are never iterated to the end.
+
+    The blob is read over plain HTTP, the storage SDK downloads blobs in
+    ranges and decodes each of them on its own, which breaks compressed ones.
+    """
+    session = aiohttp.ClientSession(
+        auto_decompress=False,
+        timeout=aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30),
+    )
+    try:
+        response = await session.get(get_blob_read_url(url))
+        response.raise_for_status()
+    except Exception:
+        await session.close()
+        raise
+    encoding = response.headers.get("Content-Encoding", IDENTITY)
+    content = iter_response(session, response)
+    close = partial(close_response, session, response)
+
+    if encoding == IDENTITY or accepts_encoding(accept_encoding, encoding):
+        return content, encoding, close
+    return iter_decompressed(content, encoding), IDENTITY, close
+
+
+def sign_playback_chunks(chunks):
+    """
+    Returns the chunks of a manifest with their url signed for reading.
+    """
+    return [{**chunk, "url": get_blob_read_url(chunk["url"])} for chunk in chunks]
+
+
+def get_playback_chunks(manifest, offset):
+    """
+    Returns the keyframe a replay starting `offset` milliseconds into the
+    recording starts from, and the chunks from the one of that keyframe to
+    the one `offset` falls in.
+    """
+    chunks = manifest["chunks"]
+    if not chunks:
+        return None, []
+
+    timestamp = (manifest["start"] or 0) + max(offset, 0)
+
+    starts = [chunk["start"] or 0 for chunk in chunks]
+    last = max(bisect_right(starts, timestamp) - 1, 0)
+
+    keyframes = manifest["keyframes"]
+    index = bisect_right([keyframe["timestamp"] for keyframe in keyframes], timestamp)
+    if index:
+        keyframe = keyframes[index - 1]
+    else:
+        # Seeking before the first keyframe, the replay starts at it
+        keyframe = keyframes[0] if keyframes else None
+        if keyframe:
+            last = max(last, keyframe["chunk"])
+
+    first = min(keyframe["chunk"], last) if keyframe else 0
+    return keyframe, chunks[first : last + 1]
@@ -0,0 +1,128 @@
+from channels.db import DatabaseSyncToAsync
+from django.conf import settings
+from websocket.utils import AsyncTTLCache
+
+import fnmatch
+import hashlib
+import re
+
+
+def compile_url_patterns(patterns):
+    """
+    Combines shell style wildcards into a single regex, None without any.
+    """
+    patterns = [pattern for pattern in patterns if pattern]
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in patterns))
+
+
+class RecordingPolicy:
+    """
+    Decides once per connection whether a session is recorded, with set
+    lookups and precompiled URL patterns only.
+
+    Sampling hashes the session id, so a session resumed after a reconnect,
+    or seen by another process, gets the same decision.
+    """
+
+    def __init__(
+        self,
+        sample_rate=1.0,
+        ignored_user_ids=(),
+        ignored_emails=(),
+        allowed_url_patterns=(),
+        denied_url_patterns=(),
+        max_session_length=None,
+    ):
+        self.sample_rate = sample_rate
+        # SESSION_IGNORE_USER_IDS applies to every organization
+        self.ignored_user_ids = frozenset(
+            str(user_id)
+            for user_id in (*settings.SESSION_IGNORE_USER_IDS, *ignored_user_ids)
+            if user_id
+        )
+        self.ignored_emails = frozenset(email.lower() for email in ignored_emails)
+        self.allowed_urls = compile_url_patterns(allowed_url_patterns)
+        self.denied_urls = compile_url_patterns(denied_url_patterns)
+        self.max_session_length = max_session_length
+
+    @classmethod
+    def from_model(cls, policy):
+        return cls(
+            sample_rate=policy.sample_rate,
+            ignored_user_ids=policy.ignored_user_ids,
+            ignored_emails=policy.ignored_emails,
+            allowed_url_patterns=policy.allowed_url_patterns,
+            denied_url_patterns=policy.denied_url_patterns,
+            max_session_length=policy.max_session_length,
+        )
+
+    @property
+    def needs_email(self):
+        return bool(self.ignored_emails)
+
+    def is_sampled(self, session_id):
+        if self.sample_rate >= 1:
+            return True
+        if self.sample_rate <= 0:
+            return False
+        digest = hashlib.blake2b(str(session_id).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big") / 2**64 < self.sample_rate
+
+    def should_record(self, enduser_id, session_id, email=None, url=None):
+        if str(enduser_id) in self.ignored_user_ids:
+            return False
+        if email and email.lower() in self.ignored_emails:
+            return False
+
+        if self.allowed_urls and not (url and self.allowed_urls.match(url)):
+            return False
+        if self.denied_urls and url and self.denied_urls.match(url):
+            return False
+
+        return self.is_sampled(session_id)
+
+    def is_too_long(self, duration):
+        """
+        Tells whether a recording of `duration` milliseconds reached the
+        maximum session length.
+        """
+        return bool(self.max_session_length) and (
+            duration >= self.max_session_length * 1000
+        )
+
+
+@DatabaseSyncToAsync
+def fetch_recording_policy(org_id):
+    from user.models import SessionRecordingPolicy
+
+    policy = SessionRecordingPolicy.objects.filter(organization_id=org_id).first()
+    if policy is None:
+        return RecordingPolicy()
+    return RecordingPolicy.from_model(policy)
+
+
+@DatabaseSyncToAsync
+def fetch_enduser_email(enduser_id):
+    from user.models import User
+
+    return User.objects.filter(id=enduser_id).values_list("email", flat=True).first()
+
+
+class RecordingPolicyCache(AsyncTTLCache):
+    """
+    Organization id -> RecordingPolicy for the connects of the end users.
+    """
+
+    def __init__(self):
+        super().__init__(
+            fetch_recording_policy,
+            maxsize=settings.SESSION_POLICY_CACHE_SIZE,
+            ttl=settings.SESSION_POLICY_CACHE_TTL,
+        )
+
+    async def get(self, org_id):
+        if org_id is None:
+            return RecordingPolicy()
+        return await super().get(org_id)
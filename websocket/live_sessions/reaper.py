@@ -0,0 +1,179 @@
+from asgiref.sync import sync_to_async
+from datetime import datetime
+from django.conf import settings
+from websocket.live_sessions.keys import (
+    LIVE_SESSIONS_KEY,
+    get_events_key,
+    get_session_key,
+    get_stream_key,
+)
+from websocket.live_sessions.locks import acquire_session_lock, release_session_lock
+from websocket.live_sessions.metadata import SessionMetadata, save_session_metadata
+from websocket.live_sessions.storage import (
+    SessionBlobWriter,
+    checkpoint_session,
+    get_session_blob_name,
+)
+from websocket.live_sessions.streams import (
+    FINALIZING_FIELD,
+    enqueue_finalize,
+    is_stream_mode,
+)
+
+import json
+import logging
+import re
+import time
+
+
+logger = logging.getLogger("django")
+
+# {channel_type}_{org_id}_{enduser_id}_{session_id}, org_id is a uuid token
+CHANNEL_GROUP_NAME_RE = re.compile(
+    r"^(?P<channel_type>.*?)_(?P<org_id>[0-9a-fA-F-]{36})_(?P<enduser_id>\d+)_(?P<session_id>.+)$"
+)
+
+
+def parse_channel_group_name(channel_group_name):
+    match = CHANNEL_GROUP_NAME_RE.match(channel_group_name)
+    if match is None:
+        return None
+    return match.groupdict()
+
+
+async def adopt_untracked_sessions(redis, now):
+    """
+    Tracks the event buffers that are not in LIVE_SESSIONS_KEY, e.g. the ones
+    left behind before the sessions were tracked, as if they were seen now.
+    Sessions queued for the finalizers are left to them.
+    """
+    prefix = get_stream_key("") if is_stream_mode() else get_events_key("")
+    async for key in redis.scan_iter(match=f"{prefix}*", count=1000):
+        channel_group_name = key.decode()[len(prefix) :]
+        if await redis.hexists(get_session_key(channel_group_name), FINALIZING_FIELD):
+            continue
+        await redis.zadd(LIVE_SESSIONS_KEY, {channel_group_name: now}, nx=True)
+
+
+async def load_session_meta(redis, channel_group_name):
+    """
+    Returns the session hash written on connect, or what can be recovered
+    from the channel group name for sessions that have none.
+    """
+    meta = {
+        key.decode(): value.decode()
+        for key, value in (
+            await redis.hgetall(get_session_key(channel_group_name))
+        ).items()
+    }
+    return meta or parse_channel_group_name(channel_group_name)
+
+
+def get_session_writer(meta, channel_group_name):
+    blob_name = meta.get("blob_name") or get_session_blob_name(
+        meta["org_id"], channel_group_name, datetime.utcnow()
+    )
+    return SessionBlobWriter(blob_name, state=json.loads(meta.get("writer", "{}")))
+
+
+async def save_session_recording(meta, writer):
+    """
+    Links the blob of `writer` to its UserSession and creates the session
+    event, like the disconnect of EndUserConsumer does.
+    """
+    from django_q.tasks import async_task
+    from user.models import UserSession
+
+    session = await UserSession.objects.filter(
+        session_id=meta["session_id"], user_id=meta["enduser_id"]
+    ).afirst()
+    if session is None:
+        logger.error(f"No UserSession found for the session {meta['session_id']}")
+        return
+
+    session.storage_url = writer.url
+    await session.asave()
+
+    # Sessions recorded before the metadata was kept only have the duration
+    metadata = SessionMetadata(json.loads(meta.get("metadata", "{}")))
+    if metadata.event_count:
+        await save_session_metadata(session, metadata)
+
+    # create an Event object for the session using django_q
+    await sync_to_async(async_task)(
+        "websocket.live_sessions.tasks.create_session_event",
+        writer.url,
+        session,
+        meta["enduser_id"],
+        metadata.duration or writer.total_duration,
+    )
+
+
+async def finalize_session(redis, channel_group_name):
+    """
+    Saves what is left of an orphaned session to azure storage, or hands it
+    over to the finalizers in the stream storage mode.
+    """
+    if is_stream_mode():
+        await enqueue_finalize(redis, channel_group_name)
+        return None
+
+    meta = await load_session_meta(redis, channel_group_name)
+    if meta is None:
+        logger.error(f"Unable to parse the session {channel_group_name}")
+        await redis.zrem(LIVE_SESSIONS_KEY, channel_group_name)
+        return None
+
+    writer = get_session_writer(meta, channel_group_name)
+    await checkpoint_session(
+        redis,
+        get_events_key(channel_group_name),
+        writer,
+        get_session_key(channel_group_name),
+    )
+
+    if writer.url:
+        await save_session_recording(meta, writer)
+
+    pipe = redis.pipeline(transaction=False)
+    pipe.delete(get_session_key(channel_group_name))
+    pipe.zrem(LIVE_SESSIONS_KEY, channel_group_name)
+    await pipe.execute()
+
+    return writer.url
+
+
+async def reap_idle_sessions(redis):
+    """
+    Finalizes the sessions that have not been seen alive for
+    SESSION_REAPER_IDLE_TIMEOUT seconds and returns how many were reaped.
+    """
+    now = time.time()
+    await adopt_untracked_sessions(redis, now)
+
+    idle_sessions = await redis.zrangebyscore(
+        LIVE_SESSIONS_KEY, "-inf", now - settings.SESSION_REAPER_IDLE_TIMEOUT
+    )
+
+    reaped = 0
+    for channel_group_name in idle_sessions:
+        channel_group_name = channel_group_name.decode()
+        # Another reaper, or a connection, may be using the same session
+        token = await acquire_session_lock(redis, channel_group_name)
+        if token is None:
+            continue
+
+        try:
+            # Saved by its connection, or seen alive again, meanwhile
+            score = await redis.zscore(LIVE_SESSIONS_KEY, channel_group_name)
+            if score is None or score > now - settings.SESSION_REAPER_IDLE_TIMEOUT:
+                continue
+
+            await finalize_session(redis, channel_group_name)
+            reaped += 1
+        except Exception as e:
+            logger.error(f"Error during reaping {channel_group_name}: {e}")
+        finally:
+            await release_session_lock(redis, channel_group_name, token)
+
+    return reaped
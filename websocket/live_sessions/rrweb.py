@@ -0,0 +1,90 @@
+from websocket.live_sessions.frames import decode_binary_frame, is_binary_frame
+
+import json
+import re
+
+
+# rrweb event types
+DOM_CONTENT_LOADED = 0
+LOAD = 1
+FULL_SNAPSHOT = 2
+INCREMENTAL_SNAPSHOT = 3
+META = 4
+CUSTOM = 5
+
+# rrweb incremental snapshot sources
+MUTATION = 0
+MOUSE_MOVE = 1
+MOUSE_INTERACTION = 2
+SCROLL = 3
+VIEWPORT_RESIZE = 4
+INPUT = 5
+TOUCH_MOVE = 6
+MEDIA_INTERACTION = 7
+STYLE_SHEET_RULE = 8
+CANVAS_MUTATION = 9
+FONT = 10
+LOG = 11
+DRAG = 12
+
+# Events a replay cannot start without
+KEYFRAME_TYPES = {FULL_SNAPSHOT, META}
+
+# rrweb serializes the type and the source first, so the kind of most events
+# is read without decoding them
+EVENT_KIND_RE = re.compile(
+    r'^\{"type":\s*(\d+),\s*"data":\s*\{\s*(?:"source":\s*(\d+))?'
+)
+
+# and the timestamp last, possibly followed by the delay of the event
+EVENT_TIMESTAMP_RE = re.compile(
+    r'"timestamp":\s*(\d+)\s*(?:,\s*"delay":\s*-?[\d.]+\s*)?\}$'
+)
+
+
+def decode_event(stored_event):
+    if isinstance(stored_event, bytes) and is_binary_frame(stored_event):
+        return decode_binary_frame(stored_event)
+    return json.loads(stored_event)
+
+
+def get_event_kind(stored_event):
+    """
+    Returns the (type, source) of a stored event, source is None for events
+    that are not incremental snapshots.
+    """
+    if isinstance(stored_event, bytes):
+        if is_binary_frame(stored_event):
+            event = decode_binary_frame(stored_event)
+        else:
+            # JSON read back from Redis, the regex only needs the head of it
+            return get_event_kind(stored_event.decode())
+    else:
+        match = EVENT_KIND_RE.match(stored_event)
+        if match:
+            event_type, source = match.groups()
+            if source is not None:
+                return int(event_type), int(source)
+            if int(event_type) != INCREMENTAL_SNAPSHOT:
+                return int(event_type), None
+        event = json.loads(stored_event)
+
+    data = event.get("data")
+    source = data.get("source") if isinstance(data, dict) else None
+    return event.get("type"), source
+
+
+def get_event_time(stored_event):
+    """
+    Returns the timestamp of a stored event, read without decoding it when
+    rrweb serialized it last.
+    """
+    if isinstance(stored_event, str):
+        match = EVENT_TIMESTAMP_RE.search(stored_event)
+        if match:
+            return int(match.group(1))
+    return int(decode_event(stored_event)["timestamp"])
+
+
+def is_keyframe(event_type):
+    return event_type in KEYFRAME_TYPES
@@ -0,0 +1,402 @@
+from azure.storage.blob import BlobBlock, ContentSettings
+from azure.storage.blob.aio import BlobServiceClient
+from contextlib import asynccontextmanager
+from django.conf import settings
+from websocket.live_sessions.compression import IDENTITY, compress, get_blob_encoding
+from websocket.live_sessions.frames import to_json_event
+from websocket.live_sessions.rrweb import FULL_SNAPSHOT, META, get_event_kind
+from websocket.live_sessions.streams import STREAM_EVENT_FIELD
+
+import json
+import logging
+
+
+logger = logging.getLogger("django")
+
+
+def get_session_blob_name(org_id, channel_group_name, started_at):
+    prefix = settings.AZURE_STORAGE_SESSIONS_PREFIX
+    return f"{prefix}/{org_id}/{channel_group_name}/{started_at.isoformat()}.json"
+
+
+def get_event_timestamp(raw_event):
+    """
+    Returns the rrweb timestamp of a single raw (JSON encoded) event.
+    """
+    try:
+        return int(json.loads(raw_event)["timestamp"])
+    except Exception as e:
+        logger.error(f"Error while reading event timestamp: {e}")
+        return None
+
+
+@asynccontextmanager
+async def session_container_client():
+    blob_service_client = BlobServiceClient.from_connection_string(
+        settings.AZURE_STORAGE_CONNECTION_STRING
+    )
+    container_client = blob_service_client.get_container_client(
+        settings.AZURE_STORAGE_CONTAINER_NAME
+    )
+    try:
+        yield container_client
+    finally:
+        # Ensure that the clients are properly closed
+        await container_client.close()
+        await blob_service_client.close()
+
+
+class SessionBlobWriter:
+    """
+    Streams raw rrweb events into block blobs as JSON arrays.
+
+    Events are appended to an in-memory block which is staged as soon as it
+    grows past SESSION_UPLOAD_BLOCK_SIZE, so memory stays bounded by one block
+    no matter how long the session is. Apart from the events that came in as
+    binary frames, only the first and the last event of a blob are ever
+    decoded, to compute the time range it covers.
+
+    Every commit ends with the same closing-bracket block, so a blob is a
+    valid JSON array after each checkpoint and later commits simply insert
+    their data blocks in front of it.
+
+    With a chunk size, the recording is split into blobs of about that many
+    bytes and the url of the writer is the one of a manifest listing them,
+    see `get_manifest`. Without one it is a single blob named `blob_name`.
+
+    With an encoding, every block is compressed on its own and the blobs are
+    uploaded with the matching Content-Encoding, see `compress`.
+    """
+
+    TRAILER_BLOCK_ID = "trailer0"
+    MANIFEST_VERSION = 1
+
+    def __init__(
+        self, blob_name, block_size=None, state=None, chunk_size=None, encoding=None
+    ):
+        self.blob_name = blob_name
+        self.block_size = block_size or settings.SESSION_UPLOAD_BLOCK_SIZE
+        if chunk_size is None:
+            chunk_size = settings.SESSION_CHUNK_SIZE
+        if encoding is None:
+            encoding = get_blob_encoding()
+        self.set_state(state or {}, chunk_size, encoding)
+
+    def get_state(self):
+        """
+        Returns the committed state of the writer as a JSON serializable dict.
+        """
+        return {
+            "block_ids": list(self.block_ids),
+            "event_count": self.event_count,
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "url": self.url,
+            "chunk_size": self.chunk_size,
+            "encoding": self.encoding,
+            "chunks": list(self.chunks),
+            "chunk_bytes": self.chunk_bytes,
+            "chunk_event_count": self.chunk_event_count,
+            "chunk_start": self.chunk_start,
+            "chunk_url": self.chunk_url,
+            "keyframes": list(self.keyframes),
+            "last_event_type": self.last_event_type,
+        }
+
+    def set_state(self, state, chunk_size=None, encoding=None):
+        self.block_ids = list(state.get("block_ids", []))
+        self.event_count = state.get("event_count", 0)
+        self.first_timestamp = state.get("first_timestamp")
+        self.last_timestamp = state.get("last_timestamp")
+        self.url = state.get("url")
+        if "chunk_size" in state:
+            self.chunk_size = state["chunk_size"]
+        elif self.block_ids:
+            # Started before the recordings were chunked
+            self.chunk_size = 0
+        elif chunk_size is not None:
+            self.chunk_size = chunk_size
+        if "encoding" in state:
+            self.encoding = state["encoding"]
+        elif self.block_ids:
+            # Blocks staged before the recordings were compressed
+            self.encoding = IDENTITY
+        elif encoding is not None:
+            self.encoding = encoding
+        self.chunks = list(state.get("chunks", []))
+        self.chunk_bytes = state.get("chunk_bytes", 0)
+        self.chunk_event_count = state.get("chunk_event_count", self.event_count)
+        self.chunk_start = state.get("chunk_start", self.first_timestamp)
+        self.chunk_url = state.get("chunk_url", self.url)
+        self.keyframes = list(state.get("keyframes", []))
+        self.last_event_type = state.get("last_event_type")
+        self.last_event = None
+        # The opening bracket lives in the first data block
+        self.block = bytearray() if self.block_ids else bytearray(b"[")
+
+    @property
+    def total_duration(self):
+        if self.first_timestamp is None or self.last_timestamp is None:
+            return 0
+        return self.last_timestamp - self.first_timestamp
+
+    @property
+    def chunk_blob_name(self):
+        if not self.chunk_size:
+            return self.blob_name
+        return (
+            f"{self.blob_name.removesuffix('.json')}/chunk-{len(self.chunks):05d}.json"
+        )
+
+    @property
+    def manifest_blob_name(self):
+        return f"{self.blob_name.removesuffix('.json')}/manifest.json"
+
+    async def write(self, container_client, raw_events):
+        for raw_event in raw_events:
+            raw_event = to_json_event(raw_event)
+
+            if (
+                self.chunk_size
+                and self.chunk_event_count
+                and self.chunk_bytes + len(self.block) >= self.chunk_size
+            ):
+                await self.finish_chunk(container_client)
+
+            if self.chunk_event_count:
+                self.block += b","
+            else:
+                self.chunk_start = get_event_timestamp(raw_event)
+                if not self.event_count:
+                    self.first_timestamp = self.chunk_start
+
+            if self.chunk_size:
+                self.add_keyframe(raw_event)
+
+            self.block += raw_event
+            self.event_count += 1
+            self.chunk_event_count += 1
+            self.last_event = raw_event
+
+            if len(self.block) >= self.block_size:
+                await self.stage_block(container_client)
+
+    def add_keyframe(self, raw_event):
+        """
+        Records where a replay can start, at a meta event or at a full
+        snapshot that does not follow one.
+        """
+        try:
+            event_type, _ = get_event_kind(raw_event)
+        except Exception as e:
+            logger.error(f"Error while reading the event kind: {e}")
+            event_type = None
+
+        if event_type == META or (
+            event_type == FULL_SNAPSHOT and self.last_event_type != META
+        ):
+            self.keyframes.append(
+                {
+                    "timestamp": get_event_timestamp(raw_event),
+                    "chunk": len(self.chunks),
+                }
+            )
+        self.last_event_type = event_type
+
+    async def stage_block(self, container_client):
+        if not self.block:
+            return
+        block_id = f"{len(self.block_ids):08d}"
+        blob_client = container_client.get_blob_client(self.chunk_blob_name)
+        await blob_client.stage_block(
+            block_id, compress(bytes(self.block), self.encoding)
+        )
+        self.block_ids.append(block_id)
+        self.chunk_bytes += len(self.block)
+        self.block = bytearray()
+
+    async def commit_chunk(self, container_client):
+        await self.stage_block(container_client)
+        if self.last_event is not None:
+            self.last_timestamp = get_event_timestamp(self.last_event)
+            self.last_event = None
+
+        blob_client = container_client.get_blob_client(self.chunk_blob_name)
+        if not self.chunk_url:
+            await blob_client.stage_block(
+                self.TRAILER_BLOCK_ID, compress(b"]", self.encoding)
+            )
+
+        await blob_client.commit_block_list(
+            [BlobBlock(block_id=block_id) for block_id in self.block_ids]
+            + [BlobBlock(block_id=self.TRAILER_BLOCK_ID)],
+            content_settings=ContentSettings(
+                content_type="application/json",
+                content_encoding=self.encoding or None,
+            ),
+        )
+        self.chunk_url = blob_client.url
+
+    def get_chunk(self):
+        return {
+            "url": self.chunk_url,
+            "start": self.chunk_start,
+            "end": self.last_timestamp,
+            "event_count": self.chunk_event_count,
+        }
+
+    async def finish_chunk(self, container_client):
+        await self.commit_chunk(container_client)
+        self.chunks.append(self.get_chunk())
+        self.block_ids = []
+        self.block = bytearray(b"[")
+        self.chunk_bytes = 0
+        self.chunk_event_count = 0
+        self.chunk_start = None
+        self.chunk_url = None
+
+    async def commit(self, container_client):
+        if not self.event_count:
+            return
+
+        if self.chunk_event_count:
+            await self.commit_chunk(container_client)
+
+        if not self.chunk_size:
+            self.url = self.chunk_url
+            return
+
+        blob_client = container_client.get_blob_client(self.manifest_blob_name)
+        await blob_client.upload_blob(
+            json.dumps(self.get_manifest()),
+            overwrite=True,
+            content_settings=ContentSettings(content_type="application/json"),
+        )
+        self.url = blob_client.url
+
+    def get_manifest(self):
+        """
+        Returns the manifest of a chunked recording: the time range of every
+        chunk, and the keyframes along with the chunk each of them is in.
+
+        The keyframe of a chunk is the last one before it starts, or its first
+        one for the chunks nothing before can be replayed from.
+        """
+        chunks = self.chunks + ([self.get_chunk()] if self.chunk_event_count else [])
+        for index, chunk in enumerate(chunks):
+            before = [kf for kf in self.keyframes if kf["chunk"] < index]
+            within = [kf for kf in self.keyframes if kf["chunk"] == index]
+            keyframe = before[-1] if before else (within[0] if within else None)
+            chunks[index] = {"index": index, **chunk, "keyframe": keyframe}
+
+        return {
+            "version": self.MANIFEST_VERSION,
+            "start": self.first_timestamp,
+            "end": self.last_timestamp,
+            "duration": self.total_duration,
+            "event_count": self.event_count,
+            "chunks": chunks,
+            "keyframes": self.keyframes,
+        }
+
+
+# Saves the writer state of a checkpoint in the session hash and trims the
+# events it committed, unless another connection resumed the session
+# meanwhile. ARGV is the connection ("" for the reaper), the writer state and
+# the number of events committed.
+CHECKPOINT_SCRIPT = """
+if ARGV[1] ~= "" then
+    local connection = redis.call("HGET", KEYS[1], "connection")
+    if connection and connection ~= ARGV[1] then
+        return 0
+    end
+end
+redis.call("HSET", KEYS[1], "writer", ARGV[2])
+redis.call("LTRIM", KEYS[2], ARGV[3], -1)
+return 1
+"""
+
+
+async def checkpoint_session(redis, redis_key, writer, session_key, connection=None):
+    """
+    Moves every event currently stored under `redis_key` into the blob of
+    `writer` and commits it.
+
+    Only the events that were present when the checkpoint started are trimmed
+    from the list, and only after the commit succeeded, so events pushed in the
+    meantime and events of a failed upload stay in Redis for the next one.
+    The new writer state is saved in the hash `session_key` atomically with
+    the trim, so a resumed writer never misses trimmed events. Neither is done
+    once `connection` no longer owns the session, its events stay in Redis
+    for the connection that does.
+    """
+    batch_size = settings.SESSION_DRAIN_BATCH_SIZE
+
+    total = await redis.llen(redis_key)
+    if not total:
+        return 0
+
+    state = writer.get_state()
+    try:
+        async with session_container_client() as container_client:
+            start = 0
+            while start < total:
+                end = min(start + batch_size, total) - 1
+                batch = await redis.lrange(redis_key, start, end)
+                if not batch:
+                    break
+                await writer.write(container_client, batch)
+                start += len(batch)
+
+            await writer.commit(container_client)
+    except BaseException:
+        # Forget the staged blocks, the events are still in Redis
+        writer.set_state(state)
+        raise
+
+    saved = await redis.eval(
+        CHECKPOINT_SCRIPT,
+        2,
+        session_key,
+        redis_key,
+        connection or "",
+        json.dumps(writer.get_state()),
+        start,
+    )
+    return start if saved else 0
+
+
+async def checkpoint_stream(redis, stream_key, writer):
+    """
+    Stream counterpart of checkpoint_session, the entries are read in
+    batches and committed to the blob.
+
+    Nothing is trimmed from the stream, it is deleted by the finalizer once
+    the session is saved. A failed save then starts over from the first
+    event, into the same blob.
+    """
+    batch_size = settings.SESSION_DRAIN_BATCH_SIZE
+    field = STREAM_EVENT_FIELD.encode()
+
+    count = 0
+    state = writer.get_state()
+    try:
+        async with session_container_client() as container_client:
+            start = "-"
+            while True:
+                entries = await redis.xrange(stream_key, min=start, count=batch_size)
+                if not entries:
+                    break
+                await writer.write(
+                    container_client, [fields[field] for _, fields in entries]
+                )
+                count += len(entries)
+                start = f"({entries[-1][0].decode()}"
+
+            await writer.commit(container_client)
+    except BaseException:
+        # Forget the staged blocks, the events are still in Redis
+        writer.set_state(state)
+        raise
+
+    return count
@@ -0,0 +1,80 @@
+from django.conf import settings
+from websocket.live_sessions.keys import (
+    FINALIZE_STREAM_KEY,
+    LIVE_SESSIONS_KEY,
+    get_session_key,
+)
+
+
+# In the "stream" storage mode the events of a session are appended to a
+# Redis stream, and saving the session is queued for the finalizers instead
+# of being done by the websocket process on disconnect.
+STREAM_STORAGE_MODE = "stream"
+
+STREAM_EVENT_FIELD = "event"
+FINALIZE_SESSION_FIELD = "session"
+# Set in the session hash once the session is queued for the finalizers
+FINALIZING_FIELD = "finalizing"
+FINALIZER_GROUP = "session_finalizers"
+
+
+def is_stream_mode():
+    return settings.SESSION_STORAGE_MODE == STREAM_STORAGE_MODE
+
+
+# Appends the events of a connection and records its progress in the session
+# hash, unless a resumed connection replaced it meanwhile. The widget sends
+# the events again to the new connection, which owns the session from then
+# on. ARGV is the connection, the stream event field ("" in the list mode),
+# the seq and the metadata, followed by the events.
+APPEND_EVENTS_SCRIPT = """
+local connection = redis.call("HGET", KEYS[1], "connection")
+if connection and connection ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == "" then
+    for i = 5, #ARGV, 1000 do
+        redis.call("RPUSH", KEYS[2], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+    end
+else
+    for i = 5, #ARGV do
+        redis.call("XADD", KEYS[2], "*", ARGV[2], ARGV[i])
+    end
+end
+redis.call("HSET", KEYS[1], "seq", ARGV[3], "metadata", ARGV[4])
+return 1
+"""
+
+
+def append_events(pipe, session_key, redis_key, connection, events, progress):
+    """
+    Queues appending `events` to a session and recording `progress` in its
+    hash on the pipeline, nothing is written if `connection` is superseded.
+    """
+    # Not capped with MAXLEN in the stream mode, which would drop the first
+    # events and the full snapshot with them. Consumers stop recording at
+    # SESSION_STREAM_MAXLEN.
+    pipe.eval(
+        APPEND_EVENTS_SCRIPT,
+        2,
+        session_key,
+        redis_key,
+        connection,
+        STREAM_EVENT_FIELD if is_stream_mode() else "",
+        progress["seq"],
+        progress["metadata"],
+        *events,
+    )
+
+
+async def enqueue_finalize(redis, channel_group_name):
+    """
+    Hands a session over to the finalizers, the session hash is kept for them
+    but no connection resumes it and the reaper does not adopt it anymore.
+    """
+    pipe = redis.pipeline(transaction=False)
+    pipe.hdel(get_session_key(channel_group_name), "connection")
+    pipe.hset(get_session_key(channel_group_name), FINALIZING_FIELD, 1)
+    pipe.xadd(FINALIZE_STREAM_KEY, {FINALIZE_SESSION_FIELD: channel_group_name})
+    pipe.zrem(LIVE_SESSIONS_KEY, channel_group_name)
+    await pipe.execute()
@@ -1,7 +1,11 @@
+from asgiref.sync import async_to_sync
+from redis.asyncio import Redis
 from user.models import UserSession
 from events.models import Event
 from user.constants import SESSION_RECORDING
 from home.event_types import SUCCESS, AUTOMATIC, SESSION, SESSION_RECORDING_NAME
+from websocket.live_sessions.reaper import reap_idle_sessions
+from websocket.utils import get_redis_url
 
 import logging
 
@@ -36,3 +40,24 @@ def create_session_event(storage_url, session, enduser_id, total_duration):
 
     except Exception as e:
         logger.error(f"Error during create_event: {e}")
+
+
+def reap_orphaned_sessions():
+    """
+    Finalizes the live sessions whose process went away without a disconnect.
+    """
+
+    async def reap():
+        # A client of its own, the task does not run on the consumers loop
+        redis = Redis.from_url(get_redis_url())
+        try:
+            return await reap_idle_sessions(redis)
+        finally:
+            await redis.aclose()
+
+    try:
+        reaped = async_to_sync(reap)()
+        logger.info(f"Reaped {reaped} orphaned sessions")
+        return reaped
+    except Exception as e:
+        logger.error(f"Error during reap_orphaned_sessions: {e}")
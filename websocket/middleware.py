@@ -1,11 +1,22 @@
 from channels.middleware import BaseMiddleware
 from channels.auth import AuthMiddlewareStack
 from channels.db import DatabaseSyncToAsync
+from django.conf import settings
 from urllib.parse import parse_qs
+from websocket.utils import AsyncTTLCache
+
+from collections import Counter
+
+import uuid
+
+
+# Close code of the connections refused by the admission control, the
+# clients are expected to back off before reconnecting
+TOO_MANY_CONNECTIONS_CLOSE_CODE = 4429
 
 
 @DatabaseSyncToAsync
-def get_organization_by_token(token):
+def fetch_organization_by_token(token):
     from user.models import Organization
 
     try:
@@ -14,6 +25,100 @@ def get_organization_by_token(token):
         return None
 
 
+class OrganizationTokenCache(AsyncTTLCache):
+    """
+    Token -> Organization (None for unknown tokens) for the websocket
+    handshakes.
+    """
+
+    def __init__(self):
+        super().__init__(
+            fetch_organization_by_token,
+            maxsize=settings.WEBSOCKET_TOKEN_CACHE_SIZE,
+            ttl=settings.WEBSOCKET_TOKEN_CACHE_TTL,
+        )
+
+    def invalidate(self, token):
+        super().invalidate(str(token))
+
+
+async def get_organization_by_token(token):
+    try:
+        token = str(uuid.UUID(token))
+    except ValueError:
+        return None
+
+    return await OrganizationTokenCache.get_instance().get(token)
+
+
+class ConnectionAdmission:
+    """
+    Counts the open websocket connections of the process, in total and per
+    organization, and refuses new ones past WEBSOCKET_MAX_CONNECTIONS and
+    WEBSOCKET_MAX_CONNECTIONS_PER_ORG. A limit of 0 disables it.
+    """
+
+    _instance = None
+
+    def __init__(self):
+        self.max_connections = settings.WEBSOCKET_MAX_CONNECTIONS
+        self.max_connections_per_org = settings.WEBSOCKET_MAX_CONNECTIONS_PER_ORG
+        self.connections = 0
+        self.connections_per_org = Counter()
+        self.rejected = Counter()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def acquire(self, org_id):
+        if self.max_connections and self.connections >= self.max_connections:
+            self.rejected["process"] += 1
+            return False
+        if (
+            self.max_connections_per_org
+            and self.connections_per_org[org_id] >= self.max_connections_per_org
+        ):
+            self.rejected["organization"] += 1
+            return False
+
+        self.connections += 1
+        self.connections_per_org[org_id] += 1
+        return True
+
+    def release(self, org_id):
+        self.connections -= 1
+        self.connections_per_org[org_id] -= 1
+        if self.connections_per_org[org_id] <= 0:
+            del self.connections_per_org[org_id]
+
+    def get_metrics(self):
+        busiest = self.connections_per_org.most_common(1)
+        return {
+            "connections": self.connections,
+            "max_connections": self.max_connections,
+            "organizations": len(self.connections_per_org),
+            "max_connections_per_org": self.max_connections_per_org,
+            "busiest_organization_connections": busiest[0][1] if busiest else 0,
+            "rejected_by_process_limit": self.rejected["process"],
+            "rejected_by_organization_limit": self.rejected["organization"],
+        }
+
+
+async def reject_connection(receive, send, code, reason):
+    """
+    Accepts then closes the connection, close codes only reach the client
+    once the handshake is complete.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+    await send({"type": "websocket.accept"})
+    await send({"type": "websocket.close", "code": code, "reason": reason})
+
+
 class TokenAuthMiddleware(BaseMiddleware):
     async def __call__(self, scope, receive, send):
 
@@ -45,7 +150,21 @@ class TokenAuthMiddleware(BaseMiddleware):
 
         scope["organization"] = org
 
-        return await super().__call__(scope, receive, send)
+        # Admission control, the slot is held for the whole connection
+        admission = ConnectionAdmission.get_instance()
+        if not admission.acquire(org.id):
+            await reject_connection(
+                receive,
+                send,
+                TOO_MANY_CONNECTIONS_CLOSE_CODE,
+                "Too many connections",
+            )
+            return
+
+        try:
+            return await super().__call__(scope, receive, send)
+        finally:
+            admission.release(org.id)
 
 
 def TokenAuthMiddlewareStack(inner):
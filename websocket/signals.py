@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from user.models import Organization, SessionRecordingPolicy
+from websocket.live_sessions.policy import RecordingPolicyCache
+from websocket.middleware import OrganizationTokenCache
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+def invalidate_organization_token(sender, instance, **kwargs):
+    # Other processes pick the change up once WEBSOCKET_TOKEN_CACHE_TTL expires
+    OrganizationTokenCache.get_instance().invalidate(instance.token)
+
+
+@receiver(post_save, sender=SessionRecordingPolicy)
+@receiver(post_delete, sender=SessionRecordingPolicy)
+def invalidate_recording_policy(sender, instance, **kwargs):
+    # Other processes pick the change up once SESSION_POLICY_CACHE_TTL expires
+    RecordingPolicyCache.get_instance().invalidate(instance.organization_id)
@@ -1,6 +1,13 @@
+from cachetools import TTLCache
 from redis.asyncio import Redis
 from django.conf import settings
 
+import asyncio
+
+
+def get_redis_url():
+    return f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
+
 
 class RedisPool:
     _instance = None
@@ -8,7 +15,58 @@ class RedisPool:
     @classmethod
     async def get_instance(cls):
         if cls._instance is None:
-            cls._instance = Redis.from_url(
-                f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
-            )
+            cls._instance = Redis.from_url(get_redis_url())
         return cls._instance
+
+
+class AsyncTTLCache:
+    """
+    In-process TTL bounded LRU of key -> value loaded by the coroutine
+    function `load`. Concurrent gets of the same key share a single load.
+
+    Every invalidation bumps `generation`, a load that started before it
+    still answers its callers but is not cached, it may have read the
+    invalidated value.
+    """
+
+    _instance = None
+
+    def __init__(self, load, maxsize, ttl):
+        self.load = load
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.pending = {}
+        self.generation = 0
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    async def get(self, key):
+        try:
+            return self.cache[key]
+        except KeyError:
+            pass
+
+        lookup = self.pending.get(key)
+        if lookup is None:
+            generation = self.generation
+            lookup = asyncio.ensure_future(self.load(key))
+            lookup.add_done_callback(lambda future: self.store(key, future, generation))
+            self.pending[key] = lookup
+        return await asyncio.shield(lookup)
+
+    def store(self, key, future, generation):
+        # A load started after an invalidation may be pending for the key
+        if self.pending.get(key) is future:
+            del self.pending[key]
+        if generation != self.generation:
+            return
+        if not future.cancelled() and future.exception() is None:
+            self.cache[key] = future.result()
+
+    def invalidate(self, key):
+        self.generation += 1
+        self.cache.pop(key, None)
+        self.pending.pop(key, None)